@@ -0,0 +1,116 @@
+"""Anomaly detection cost and accuracy at fleet scale.
+
+Simulates N magnetometers reporting at 1 Hz into the in-process detector,
+following the monitor's tick order (sample every tick, detect every
+--detect-every ticks). Single-reading spikes and sustained steps are injected
+at random ticks after warm-up; the run reports how many were flagged, how many
+flags hit sensors with nothing injected, and the timing of each stage. No
+database or server is needed.
+
+Run from backend/:
+    python -m benchmarks.anomaly_detection --sensors 50000 --ticks 300
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import summarize
+from services.anomaly_service import VoltageAnomalyDetector, ANOMALY_MIN_SAMPLES
+
+
+def _injections(rng, count, sensors, first_tick, ticks):
+    """Distinct sensors, each with a random start tick in [first_tick, ticks)"""
+    chosen = rng.choice(sensors, count, replace=False)
+    return dict(zip(chosen.tolist(), rng.integers(first_tick, ticks, count).tolist()))
+
+
+def run(args):
+    rng = np.random.default_rng(args.seed)
+    detector = VoltageAnomalyDetector(window=args.window)
+    device_ids = [f"MAG-{i:07d}" for i in range(args.sensors)]
+
+    start = time.perf_counter()
+    rows = detector.rows_for(device_ids)
+    register_s = time.perf_counter() - start
+
+    # Injections start once every sensor has a full baseline and end early
+    # enough for the last one to reach a detection pass
+    warm_up = max(args.window, ANOMALY_MIN_SAMPLES)
+    last_tick = args.ticks - args.detect_every
+    injected = _injections(rng, args.spikes + args.steps, args.sensors, warm_up, last_tick)
+    spikes = dict(list(injected.items())[:args.spikes])
+    steps = dict(list(injected.items())[args.spikes:])
+    spike_ticks = {}
+    for sensor, tick in spikes.items():
+        spike_ticks.setdefault(tick, []).append(sensor)
+    step_sensors = np.array(list(steps), dtype=np.intp)
+    step_starts = np.array(list(steps.values()))
+
+    record_samples, sample_samples, detect_samples = [], [], []
+    detected, false_alarms, passes = set(), 0, 0
+    for tick in range(args.ticks):
+        voltages = 3.25 + rng.normal(0, 0.02, args.sensors)
+        voltages[spike_ticks.get(tick, [])] += args.jump
+        voltages[step_sensors[step_starts <= tick]] += args.jump
+
+        t0 = time.perf_counter()
+        detector.record_rows(rows, voltages)
+        t1 = time.perf_counter()
+        detector.sample()
+        t2 = time.perf_counter()
+        record_samples.append(t1 - t0)
+        sample_samples.append(t2 - t1)
+        if (tick + 1) % args.detect_every == 0:
+            t3 = time.perf_counter()
+            anomalies = detector.detect()
+            detect_samples.append(time.perf_counter() - t3)
+            if tick >= warm_up:
+                passes += 1
+                for anomaly in anomalies:
+                    sensor = int(anomaly["device_id"][4:])
+                    if sensor in injected and injected[sensor] <= tick:
+                        detected.add(sensor)
+                    else:
+                        false_alarms += 1
+
+    detect_summary = summarize(detect_samples)
+    return {
+        "sensors": args.sensors,
+        "window": args.window,
+        "ticks": args.ticks,
+        "detect_every": args.detect_every,
+        "register_s": round(register_s, 3),
+        "record": summarize(record_samples),
+        "sample": summarize(sample_samples),
+        "detect": detect_summary,
+        "injected_spikes": len(spikes),
+        "spike_recall": round(len(detected & spikes.keys()) / max(len(spikes), 1), 3),
+        "injected_steps": len(steps),
+        "step_recall": round(len(detected & steps.keys()) / max(len(steps), 1), 3),
+        "scored_passes": passes,
+        "false_alarms": false_alarms,
+        "false_alarms_per_pass": round(false_alarms / max(passes, 1), 3),
+        "detect_p99_budget_fraction_at_1hz": round(
+            detect_summary["p99_ms"] / 1000 / args.detect_every, 4
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", type=int, default=50000)
+    parser.add_argument("--window", type=int, default=60)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--detect-every", type=int, default=5)
+    parser.add_argument("--spikes", type=int, default=25, help="single-reading spikes at random ticks")
+    parser.add_argument("--steps", type=int, default=25, help="sustained steps starting at random ticks")
+    parser.add_argument("--jump", type=float, default=1.0, help="volts added by a spike or step")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Synthetic fleet generator for benchmarks.
+
+Writes devices, images, alerts and the operator account into a database
+handle, in chunks, with a fixed seed so runs are comparable.
+"""
+import random
+from datetime import datetime, timedelta
+
+from services.auth_service import get_password_hash
+
+# devices, images, alerts
+FLEETS = {
+    "1k": (1_000, 5_000, 2_000),
+    "100k": (100_000, 500_000, 200_000),
+    "1m": (1_000_000, 2_000_000, 1_000_000),
+}
+
+DEVICE_TYPES = ["sensorNode", "sensorNode", "sensorNode", "camera", "gateway"]
+DEVICE_STATUSES = ["safe"] * 16 + ["warning"] * 3 + ["alert"]
+IMAGE_STATUSES = ["unreviewed", "unreviewed", "legal", "illegal"]
+ALERT_TYPES = ["voltage_spike", "voltage_anomaly", "tamper", "heartbeat_lost"]
+ALERT_SEVERITIES = ["info", "warning", "critical"]
+
+# Perimeter bounding box (west, south, east, north)
+PERIMETER = (-0.5, 51.3, 0.3, 51.7)
+CHUNK_SIZE = 10_000
+
+
+def device_id_for(index: int) -> str:
+    return f"DEV-{index:07d}"
+
+
+def _devices(count: int, rng: random.Random, now: datetime):
+    west, south, east, north = PERIMETER
+    for i in range(count):
+        device_type = rng.choice(DEVICE_TYPES)
+        yield {
+            "device_id": device_id_for(i),
+            "name": f"{device_type} {i}",
+            "type": device_type,
+            "status": rng.choice(DEVICE_STATUSES),
+            "location": {
+                "type": "Point",
+                "coordinates": [rng.uniform(west, east), rng.uniform(south, north)],
+            },
+            "description": "Synthetic benchmark device",
+            "voltage": round(3.25 + rng.uniform(-0.1, 0.1), 3),
+            "last_heartbeat": now - timedelta(seconds=rng.randint(0, 300)),
+            "created_at": now - timedelta(days=rng.randint(1, 365)),
+        }
+
+
+def _images(count: int, devices: int, rng: random.Random, now: datetime):
+    for i in range(count):
+        captured_at = now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        yield {
+            "image_id": f"img-{i:08d}",
+            "device_id": device_id_for(rng.randrange(devices)),
+            "filename": f"capture_{captured_at:%Y%m%d_%H%M%S}.jpg",
+            "status": rng.choice(IMAGE_STATUSES),
+            "notes": None,
+            "captured_at": captured_at,
+        }
+
+
+def _alerts(count: int, devices: int, rng: random.Random, now: datetime):
+    for _ in range(count):
+        created_at = now - timedelta(seconds=rng.randint(0, 90 * 24 * 3600))
+        yield {
+            "device_id": device_id_for(rng.randrange(devices)),
+            "type": rng.choice(ALERT_TYPES),
+            "message": "Synthetic benchmark alert",
+            "severity": rng.choice(ALERT_SEVERITIES),
+            "acknowledged": rng.random() < 0.5,
+            "occurrence_count": rng.randint(1, 20),
+            "first_seen": created_at,
+            "last_seen": created_at,
+            "created_at": created_at,
+        }
+
+
+async def _insert_chunked(collection, documents):
+    chunk = []
+    for doc in documents:
+        chunk.append(doc)
+        if len(chunk) >= CHUNK_SIZE:
+            await collection.insert_many(chunk, ordered=False)
+            chunk = []
+    if chunk:
+        await collection.insert_many(chunk, ordered=False)
+
+
+async def generate_fleet(db, devices: int, images: int, alerts: int, seed: int = 42, password: str = "password"):
+    """Replace the benchmark collections with a freshly generated fleet"""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for name in ("users", "devices", "images", "alerts"):
+        await db[name].delete_many({})
+    await db.users.insert_one({
+        "username": "operator",
+        "hashed_password": get_password_hash(password),
+        "role": "Operator",
+        "created_at": now,
+    })
+    await _insert_chunked(db.devices, _devices(devices, rng, now))
+    await _insert_chunked(db.images, _images(images, devices, rng, now))
+    await _insert_chunked(db.alerts, _alerts(alerts, devices, rng, now))
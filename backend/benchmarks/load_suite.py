@@ -0,0 +1,175 @@
+"""API load benchmark across every router.
+
+Generates a synthetic fleet into a local mongod (or an in-memory stand-in),
+boots the app in-process and drives each route through an ASGI client at a
+fixed concurrency. Per-route throughput and p50/p95/p99 are printed and
+written as JSON so runs can be diffed.
+
+Run from backend/:
+    python -m benchmarks.load_suite --fleet 100k --requests 2000 --concurrency 32 --output results.json
+    python -m benchmarks.load_suite --fleet 1k --in-memory
+
+--in-memory needs mongomock-motor and cannot run geospatial queries, so the
+map viewport and nearby routes report errors there; use a real mongod for
+those.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+
+import database
+import main
+from benchmarks.common import summarize
+from benchmarks.datagen import FLEETS, generate_fleet, PERIMETER
+
+# name -> (method, path, json body)
+ROUTES = {
+    "auth.login": ("POST", "/api/auth/login", {"username": "operator", "password": "password", "role": "Operator"}),
+    "auth.me": ("GET", "/api/auth/me", None),
+    "dashboard.overview": ("GET", "/api/dashboard/overview", None),
+    "dashboard.devices": ("GET", "/api/dashboard/devices", None),
+    "dashboard.alerts": ("GET", "/api/dashboard/alerts", None),
+    "camera.images": ("GET", "/api/camera/images?limit=50", None),
+    "camera.images_filtered": ("GET", "/api/camera/images?status=unreviewed&limit=50", None),
+    "map.devices": ("GET", "/api/map/devices", None),
+    "map.filters": ("POST", "/api/map/filters", {"safe": True, "warning": True, "camera": True, "sensorNode": True}),
+    "map.viewport_clusters": (
+        "GET",
+        "/api/map/viewport?west={0}&south={1}&east={2}&north={3}&zoom=10".format(*PERIMETER),
+        None,
+    ),
+    "map.nearby": ("GET", "/api/map/devices/nearby?longitude=-0.1&latitude=51.5&radius=500", None),
+}
+
+
+async def connect_benchmark_database(args):
+    if args.in_memory:
+        from mongomock_motor import AsyncMongoMockClient
+        database.mongodb_client = AsyncMongoMockClient()
+        database.mongodb = database.mongodb_client[args.database]
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database.mongodb_client = AsyncIOMotorClient(args.mongodb_url)
+        database.mongodb = database.mongodb_client[args.database]
+        await database.create_indexes()
+
+
+async def drive_route(client, method, path, body, headers, requests, concurrency):
+    samples = []
+    statuses = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                code = str(response.status_code)
+            except Exception as e:  # record and keep going; one broken route must not stop the suite
+                code = type(e).__name__
+            samples.append(time.perf_counter() - start)
+            statuses[code] = statuses.get(code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {**summarize(samples, elapsed), "status_codes": statuses}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    devices, images, alerts = FLEETS[args.fleet]
+    devices = args.devices or devices
+    images = args.images if args.images is not None else images
+    alerts = args.alerts if args.alerts is not None else alerts
+
+    await connect_benchmark_database(args)
+    if not args.skip_generate:
+        start = time.perf_counter()
+        await generate_fleet(database.mongodb, devices, images, alerts, seed=args.seed)
+        generate_s = time.perf_counter() - start
+    else:
+        generate_s = None
+
+    # Boot the app against the benchmark database instead of the configured one
+    async def connect_to_benchmark():
+        pass
+    main.connect_to_mongo = connect_to_benchmark
+    for handler in main.app.router.on_startup:
+        await handler()
+
+    results = {}
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            login_method, login_path, login_body = ROUTES["auth.login"]
+            response = await client.request(login_method, login_path, json=login_body)
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            selected = args.routes or list(ROUTES)
+            for name in selected:
+                method, path, body = ROUTES[name]
+                requests = args.login_requests if name == "auth.login" else args.requests
+                results[name] = await drive_route(client, method, path, body, headers, requests, args.concurrency)
+                print(f"{name:28s} {results[name]['throughput_rps']:>9} rps  p99 {results[name]['p99_ms']} ms")
+    finally:
+        for handler in main.app.router.on_shutdown:
+            await handler()
+
+    return {
+        "run": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "backend": "in-memory" if args.in_memory else args.mongodb_url,
+            "fleet": {"devices": devices, "images": images, "alerts": alerts},
+            "generate_s": round(generate_s, 2) if generate_s is not None else None,
+            "concurrency": args.concurrency,
+            "requests_per_route": args.requests,
+        },
+        "routes": results,
+    }
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fleet", choices=FLEETS, default="1k")
+    parser.add_argument("--devices", type=int, help="override the fleet's device count")
+    parser.add_argument("--images", type=int)
+    parser.add_argument("--alerts", type=int)
+    parser.add_argument("--mongodb-url", default="mongodb://localhost:27017")
+    parser.add_argument("--database", default="sentinelguard_benchmark")
+    parser.add_argument("--in-memory", action="store_true")
+    parser.add_argument("--skip-generate", action="store_true", help="reuse the data from a previous run")
+    parser.add_argument("--routes", nargs="*", choices=ROUTES)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,92 @@
+"""Dashboard latency under a login burst.
+
+Polls /api/dashboard/overview at a steady rate, first on its own and then
+while a burst of concurrent logins is running, and compares the p99s.
+
+Run from backend/ against a running API:
+    python -m benchmarks.login_burst --base-url http://localhost:8000 --logins 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.common import summarize
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str, role: str):
+    return await client.post(
+        "/api/auth/login",
+        json={"username": username, "password": password, "role": role},
+    )
+
+
+async def poll_dashboard(client: httpx.AsyncClient, token: str, duration: float, interval: float):
+    samples = []
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get("/api/dashboard/overview", headers=headers)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def login_burst(client: httpx.AsyncClient, args):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    statuses = {}
+
+    async def one():
+        async with semaphore:
+            response = await login(client, args.username, args.password, args.role)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.logins)))
+    return statuses, time.perf_counter() - start
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        response = await login(client, args.username, args.password, args.role)
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        baseline = await poll_dashboard(client, token, args.duration, args.interval)
+
+        burst = asyncio.create_task(login_burst(client, args))
+        under_load = await poll_dashboard(client, token, args.duration, args.interval)
+        statuses, burst_elapsed = await burst
+
+    return {
+        "baseline": summarize(baseline),
+        "during_login_burst": summarize(under_load),
+        "login_burst": {
+            "logins": args.logins,
+            "concurrency": args.concurrency,
+            "elapsed_s": round(burst_elapsed, 2),
+            "status_codes": statuses,
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="operator")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--role", default="Operator")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per polling phase")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between dashboard polls")
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Response serialization cost for large device and alert lists.
+
+Compares the path FastAPI takes for a route with a response_model (build
+models from documents, re-validate against the response_model, dump to JSON
+mode, jsonable_encoder, json.dumps) against the fast path in
+services.serialization: model_construct or one batched TypeAdapter pass,
+then orjson. No database or server is needed.
+
+Run from backend/:
+    python -m benchmarks.serialization --devices 10000 --alerts 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import List
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from benchmarks.common import summarize
+from benchmarks.datagen import _devices, _alerts
+from models.devices import Device, Alert
+from services.serialization import FastJSONResponse, construct_device, construct_alert, dump_models
+
+
+def _as_stored(documents):
+    """Give generated documents the _id and millisecond datetimes Mongo returns"""
+    stored = []
+    for doc in documents:
+        doc = {"_id": ObjectId(), **doc}
+        for key, value in doc.items():
+            if isinstance(value, datetime):
+                doc[key] = value.replace(microsecond=value.microsecond // 1000 * 1000)
+        stored.append(doc)
+    return stored
+
+
+def _response_model_path(model, docs):
+    """Model per document, then FastAPI's response_model serialization"""
+    adapter = TypeAdapter(List[model])
+    models = [model(**doc) for doc in docs]
+    validated = adapter.validate_python(models)
+    content = jsonable_encoder(adapter.dump_python(validated, mode="json", by_alias=True))
+    return JSONResponse(content).body
+
+
+def _adapter_path(adapter, docs):
+    """One batched TypeAdapter validation, then orjson"""
+    return FastJSONResponse(dump_models(adapter.validate_python(docs))).body
+
+
+def _construct_path(construct, docs):
+    """model_construct per document, then orjson"""
+    return FastJSONResponse(dump_models(construct(doc) for doc in docs)).body
+
+
+def _time(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples), body
+
+
+def _compare(model, construct, docs, repeat):
+    adapter = TypeAdapter(List[model])
+    baseline, expected = _time(lambda: _response_model_path(model, docs), repeat)
+    batched, batched_body = _time(lambda: _adapter_path(adapter, docs), repeat)
+    constructed, constructed_body = _time(lambda: _construct_path(construct, docs), repeat)
+    expected = json.loads(expected)
+    return {
+        "documents": len(docs),
+        "payload_bytes": len(constructed_body),
+        "response_model": baseline,
+        "type_adapter_orjson": batched,
+        "construct_orjson": constructed,
+        "speedup_p50": round(baseline["p50_ms"] / max(constructed["p50_ms"], 0.01), 1),
+        "identical_output": json.loads(batched_body) == expected == json.loads(constructed_body),
+    }
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    devices = _as_stored(_devices(args.devices, rng, now))
+    alerts = _as_stored(_alerts(args.alerts, args.devices, rng, now))
+    return {
+        "devices": _compare(Device, construct_device, devices, args.repeat),
+        "alerts": _compare(Alert, construct_alert, alerts, args.repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--alerts", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Telemetry ingestion throughput.
+
+Posts batches of synthetic readings for a fleet of devices to
+/api/telemetry/batch at a fixed concurrency and reports accepted readings
+per second and request latency percentiles.
+
+Run from backend/ against a running API:
+    python -m benchmarks.telemetry_ingest --devices 10000 --batch-size 500 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import httpx
+
+from benchmarks.common import summarize
+
+
+def make_batch(device_ids, batch_size):
+    return {
+        "readings": [
+            {
+                "device_id": random.choice(device_ids),
+                "voltage": round(3.25 + random.uniform(-0.1, 0.1), 3),
+            }
+            for _ in range(batch_size)
+        ]
+    }
+
+
+async def run(args):
+    device_ids = [f"{args.prefix}-{i:07d}" for i in range(args.devices)]
+    samples = []
+    accepted = 0
+    rejected = 0
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+        response = await client.post(
+            "/api/auth/login",
+            json={"username": args.username, "password": args.password, "role": args.role},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            nonlocal accepted, rejected
+            while time.perf_counter() < deadline:
+                batch = make_batch(device_ids, args.batch_size)
+                start = time.perf_counter()
+                response = await client.post("/api/telemetry/batch", json=batch, headers=headers)
+                samples.append(time.perf_counter() - start)
+                if response.status_code == 202:
+                    accepted += response.json()["accepted"]
+                else:
+                    rejected += args.batch_size
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stats = (await client.get("/api/telemetry/stats", headers=headers)).json()
+
+    return {
+        "devices": args.devices,
+        "batch_size": args.batch_size,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "readings_accepted": accepted,
+        "readings_rejected": rejected,
+        "readings_per_second": round(accepted / elapsed, 1),
+        "request_latency": summarize(samples, elapsed),
+        "server_buffer": stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="operator")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--role", default="Operator")
+    parser.add_argument("--prefix", default="MAG", help="device_id prefix for synthetic devices")
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
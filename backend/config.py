@@ -1,4 +1,4 @@
-from pydantic import BaseSettings
+from pydantic_settings import BaseSettings
 from typing import List
 import os
 
@@ -15,6 +15,38 @@ class Settings(BaseSettings):
     # MongoDB Settings
     MONGODB_URL: str = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
     DATABASE_NAME: str = "sentinelguard"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 2000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+    MONGODB_SOCKET_TIMEOUT_MS: int = 20000
+    # Wire compression in order of preference ("snappy" needs python-snappy)
+    MONGODB_COMPRESSORS: str = "zstd,zlib"
+    # Read preference for read-heavy routes (gallery, exports, map, trends)
+    MONGODB_READ_PREFERENCE: str = "secondaryPreferred"
+    MONGODB_MAX_STALENESS_SECONDS: int = 90
+    # Build indexes in the background at startup; turn off when running migrations separately
+    MONGODB_CREATE_INDEXES_ON_STARTUP: bool = True
+    
+    # Retention: documents older than the hot window move to the local archive.
+    # A TTL index removes anything still in MongoDB after the grace period as a
+    # backstop; the archiver creates it, and keeps its expiry in step with these,
+    # only after a pass has archived everything past the hot window.
+    RETENTION_IMAGES_HOT_DAYS: int = 180
+    RETENTION_ALERTS_HOT_DAYS: int = 90
+    RETENTION_TTL_GRACE_DAYS: int = 30
+    RETENTION_ARCHIVE_DIR: str = "archive"
+    # With retention off nothing is archived and scripts.migrate --force drops the TTL indexes
+    RETENTION_ENABLED: bool = True
+    # How often the archiver looks for documents past their hot window
+    RETENTION_INTERVAL_SECONDS: float = 3600
+    # Documents read, written to one archive part and deleted per round trip
+    RETENTION_BATCH_SIZE: int = 1000
+    RETENTION_ZSTD_LEVEL: int = 10
+    # Only one worker archives a collection at a time; the lease outlives a crashed holder by this much
+    RETENTION_LEASE_SECONDS: float = 600
     
     # CORS Settings
     BACKEND_CORS_ORIGINS: List[str] = [
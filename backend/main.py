@@ -1,16 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 import uvicorn
 
-from routes import auth, dashboard, camera
+from routes import auth, dashboard, camera, export, telemetry, realtime
 from routes import map as map_routes
 from database import connect_to_mongo, close_mongo_connection
+from services.auth_service import shutdown_password_executor
+from services.device_registry import device_registry, start_device_registry, stop_device_registry
+from services.telemetry_service import telemetry_buffer
+from services.summary_service import device_summary
+from services.alert_coalescer import alert_coalescer
+from services.image_store import shutdown_image_pipeline
+from services.camera_stream import camera_streams
+from services.anomaly_service import anomaly_monitor
+from services.metrics import MetricsMiddleware, render_metrics
+from services.device_service import create_alert, apply_device_change
+from services.serialization import FastJSONResponse
+from services.zone_service import zone_engine
+from services.retention_service import retention_archiver
 
 app = FastAPI(
     title="SentinelGuard API",
     description="Military perimeter monitoring system API with MongoDB",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # CORS middleware for frontend integration
@@ -22,6 +37,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency and in-flight tracking for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Static files for images/assets
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -30,14 +48,36 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(camera.router, prefix="/api/camera", tags=["Camera"])
 app.include_router(map_routes.router, prefix="/api/map", tags=["Map"])
+app.include_router(export.router, prefix="/api/export", tags=["Export"])
+app.include_router(telemetry.router, prefix="/api/telemetry", tags=["Telemetry"])
+app.include_router(realtime.router, prefix="/api/realtime", tags=["Realtime"])
 
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_mongo()
+    device_registry.add_refresh_listener(device_summary.rebuild)
+    device_registry.add_refresh_listener(zone_engine.seed)
+    device_registry.set_change_handler(apply_device_change)
+    await start_device_registry()
+    await zone_engine.load(await device_registry.get_all())
+    telemetry_buffer.start()
+    alert_coalescer.start()
+    anomaly_monitor.start(create_alert)
+    zone_engine.start(create_alert)
+    retention_archiver.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await camera_streams.stop()
+    await anomaly_monitor.stop()
+    await zone_engine.stop()
+    await retention_archiver.stop()
+    await telemetry_buffer.stop()
+    await alert_coalescer.stop()
+    await stop_device_registry()
     await close_mongo_connection()
+    shutdown_password_executor()
+    shutdown_image_pipeline()
 
 @app.get("/")
 async def root():
@@ -47,5 +87,9 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "sentinelguard-api", "database": "mongodb"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -36,6 +36,8 @@ class DeviceUpdate(BaseModel):
     status: Optional[str] = None
     voltage: Optional[float] = None
     description: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)  # set together with longitude to move the device
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 class Alert(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
@@ -45,6 +47,9 @@ class Alert(BaseModel):
     severity: str
     acknowledged: bool = False
     acknowledged_by: Optional[str] = None
+    occurrence_count: int = 1
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
     created_at: datetime
 
     class Config:
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from bson import ObjectId
 from . import PyObjectId
@@ -13,6 +13,10 @@ class ImageRecord(BaseModel):
     captured_at: datetime
     reviewed_by: Optional[str] = None
     reviewed_at: Optional[datetime] = None
+    content_hash: Optional[str] = None  # sha256 of the original, keys the image store
+    content_type: Optional[str] = None
+    size: Optional[int] = None
+    variants: List[str] = []
 
     class Config:
         allow_population_by_field_name = True
@@ -23,6 +27,11 @@ class ImageUpdate(BaseModel):
     status: str
     notes: Optional[str] = None
 
+class ImageBulkUpdate(BaseModel):
+    image_ids: List[str] = Field(..., min_length=1, max_length=1000)
+    status: str
+    notes: Optional[str] = None
+
 class ImageFilter(BaseModel):
     status: Optional[str] = None
     device_id: Optional[str] = None
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List
+from datetime import datetime, timezone
+
+class TelemetryReading(BaseModel):
+    device_id: str
+    voltage: float
+    status: Optional[str] = None  # safe, warning, alert
+    recorded_at: Optional[datetime] = None  # defaults to receive time
+
+    @field_validator("recorded_at")
+    @classmethod
+    def naive_utc(cls, value):
+        # Stored and compared as naive UTC, like every other timestamp from the driver
+        if value is not None and value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class TelemetryBatch(BaseModel):
+    readings: List[TelemetryReading] = Field(..., min_length=1)
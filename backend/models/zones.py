@@ -0,0 +1,66 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional, List
+from datetime import datetime
+from bson import ObjectId
+from . import PyObjectId
+
+class ZoneGeometry(BaseModel):
+    type: str = "Polygon"
+    coordinates: List[List[List[float]]]  # GeoJSON rings of [longitude, latitude], outer ring first
+
+    @field_validator("type")
+    @classmethod
+    def polygon_only(cls, value):
+        if value != "Polygon":
+            raise ValueError("zones must be GeoJSON Polygons")
+        return value
+
+    @field_validator("coordinates")
+    @classmethod
+    def closed_rings(cls, rings):
+        if not rings:
+            raise ValueError("polygon needs an outer ring")
+        for ring in rings:
+            if len(ring) < 4 or ring[0] != ring[-1]:
+                raise ValueError("each ring needs at least 4 positions and must be closed")
+            for position in ring:
+                if len(position) != 2 or not (-180 <= position[0] <= 180 and -90 <= position[1] <= 90):
+                    raise ValueError("positions must be [longitude, latitude]")
+        return rings
+
+class Zone(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    zone_id: str = Field(..., unique=True)
+    name: str
+    type: str  # restricted, tampering, illegal, monitored - drives the overlay style
+    severity: str = "warning"  # severity of alerts raised for this zone
+    geometry: ZoneGeometry
+    active: bool = True
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str}
+
+class ZoneCreate(BaseModel):
+    zone_id: str
+    name: str
+    type: str = "restricted"
+    severity: str = "warning"
+    geometry: ZoneGeometry
+    active: bool = True
+
+class ZoneUpdate(BaseModel):
+    name: Optional[str] = None
+    type: Optional[str] = None
+    severity: Optional[str] = None
+    geometry: Optional[ZoneGeometry] = None
+    active: Optional[bool] = None
+
+class ZoneEvaluation(BaseModel):
+    device_id: str
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    kind: str = Field("detection", pattern="^(detection|position)$")  # a detection anywhere inside a zone is a breach
@@ -2,7 +2,7 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from datetime import timedelta, datetime
 from models.auth import UserLogin, Token, User
-from services.auth_service import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_user_by_username
+from services.auth_service import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_cached_user, invalidate_user, principal_cache
 from jose import JWTError, jwt
 from services.auth_service import SECRET_KEY, ALGORITHM
 from database import get_database
@@ -10,20 +10,23 @@ from database import get_database
 router = APIRouter()
 security = HTTPBearer()
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_user_from_token(token: str) -> User:
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await get_user_by_username(username)
+    user = await get_cached_user(username)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+    return await get_user_from_token(credentials.credentials)
+
 @router.post("/login", response_model=Token)
 async def login(user_data: UserLogin):
     user = await authenticate_user(user_data.username, user_data.password)
@@ -52,9 +55,15 @@ async def login(user_data: UserLogin):
         {"username": user.username}, 
         {"$set": {"last_login": datetime.utcnow()}}
     )
+    invalidate_user(user.username)
     
     return Token(access_token=access_token, token_type="bearer", user=user)
 
 @router.get("/me", response_model=User)
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
+
+@router.get("/cache/stats")
+async def get_principal_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters for the authenticated principal cache"""
+    return principal_cache.stats()
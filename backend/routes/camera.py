@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form, status as http_status
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from typing import List, Optional, Tuple
 from models.auth import User
-from models.images import ImageRecord, ImageUpdate, ImageFilter
+from models.images import ImageRecord, ImageUpdate, ImageBulkUpdate, ImageFilter
 from routes.auth import get_current_user
-from database import get_database
+from database import get_database, get_read_database
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+import base64
+import os
+from services.camera_stream import camera_streams, StreamClosed, UnknownCameraError
+from services.image_store import (
+    ingest_image, resolve_variant, CONTENT_TYPE_EXTENSIONS, IMAGE_MAX_UPLOAD_BYTES,
+    IMAGE_VARIANTS, ORIGINAL_VARIANT, InvalidImageError
+)
 
 router = APIRouter()
 
+MJPEG_BOUNDARY = "frame"
+
 @router.get("/live-feed")
 async def get_live_feed(current_user: User = Depends(get_current_user)):
     """Get current live feed status"""
@@ -16,40 +30,301 @@ async def get_live_feed(current_user: User = Depends(get_current_user)):
         "status": "live",
         "camera_id": "CAM-002-B",
         "resolution": "1920x1080",
-        "fps": 30
+        "fps": 30,
+        "streams": camera_streams.stats()
+    }
+
+async def _mjpeg_frames(camera_id: str):
+    producer = camera_streams.acquire(camera_id)
+    try:
+        seen = producer.ring.sequence - 1
+        while True:
+            try:
+                seen, frame = await producer.ring.wait_newer(seen)
+            except StreamClosed:
+                return
+            yield (
+                f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                f"Content-Length: {len(frame)}\r\n\r\n"
+            ).encode()
+            yield frame  # the producer's bytes object, not a copy
+            yield b"\r\n"
+    finally:
+        camera_streams.release(producer)
+
+@router.get("/stream")
+async def stream_camera(
+    camera_id: str = "CAM-002-B",
+    current_user: User = Depends(get_current_user)
+):
+    """MJPEG live stream; all viewers of a camera share one producer"""
+    try:
+        camera_streams.check_camera(camera_id)
+    except UnknownCameraError:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return StreamingResponse(
+        _mjpeg_frames(camera_id),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-store"}
+    )
+
+# Gallery pagination
+IMAGES_DEFAULT_PAGE_SIZE = 50
+IMAGES_MAX_PAGE_SIZE = 200
+# Devices listed in the gallery's per-device counts, busiest first
+IMAGES_FACET_DEVICE_LIMIT = 100
+IMAGE_GALLERY_PROJECTION = {
+    "_id": 1,
+    "image_id": 1,
+    "device_id": 1,
+    "filename": 1,
+    "status": 1,
+    "captured_at": 1,
+    "notes": 1,
+    "content_hash": 1,
+}
+# Read size for ranged downloads
+FILE_CHUNK_SIZE = 256 * 1024
+
+def _encode_cursor(captured_at: datetime, object_id: ObjectId) -> str:
+    raw = f"{captured_at.isoformat()}|{object_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str):
+    try:
+        captured_at, object_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(captured_at), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _format_gallery_image(img: dict) -> dict:
+    return {
+        "id": img.get("image_id"),
+        "device_id": img.get("device_id"),
+        "filename": img.get("filename"),
+        "status": img.get("status"),
+        "timestamp": img.get("captured_at").strftime("%Y-%m-%d %I:%M %p") if img.get("captured_at") else None,
+        "notes": img.get("notes"),
+        "thumbnail_url": f"/api/camera/images/{img.get('image_id')}/file?variant=thumb" if img.get("content_hash") else None
     }
 
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range into an inclusive (start, end)"""
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:  # suffix range: the last N bytes
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        return None
+    if start > end or start >= size:
+        raise HTTPException(
+            status_code=http_status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, min(end, size - 1)
+
+def _iter_file_range(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(FILE_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@router.post("/images", status_code=http_status.HTTP_201_CREATED)
+async def upload_image(
+    device_id: str = Form(...),
+    captured_at: Optional[datetime] = Form(None),
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Ingest a capture into the image store and register it in the gallery"""
+    if file.content_type not in CONTENT_TYPE_EXTENSIONS:
+        raise HTTPException(status_code=415, detail="Unsupported image type")
+    data = await file.read(IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large")
+    
+    try:
+        stored = await ingest_image(data, file.content_type)
+    except InvalidImageError as e:
+        raise HTTPException(status_code=415 if e.unsupported else 400, detail=str(e))
+    image_doc = {
+        "image_id": f"img-{ObjectId()}",
+        "device_id": device_id,
+        "filename": file.filename,
+        "status": "unreviewed",
+        "notes": None,
+        "captured_at": captured_at or datetime.utcnow(),
+        **stored
+    }
+    db = get_database()
+    await db.images.insert_one(image_doc)
+    return _format_gallery_image(image_doc)
+
+@router.get("/images/{image_id}/file")
+async def download_image(
+    image_id: str,
+    request: Request,
+    variant: str = Query(ORIGINAL_VARIANT, pattern=f"^({'|'.join([ORIGINAL_VARIANT, *IMAGE_VARIANTS])})$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Serve a stored capture or one of its gallery variants, with Range and ETag support"""
+    db = get_database()
+    image = await db.images.find_one(
+        {"image_id": image_id}, {"_id": 0, "content_hash": 1, "content_type": 1}
+    )
+    if not image or not image.get("content_hash"):
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = resolve_variant(image["content_hash"], image["content_type"], variant)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image file not found")
+    
+    media_type = image["content_type"] if variant == ORIGINAL_VARIANT else "image/jpeg"
+    # Content-addressed files never change, so the hash is a strong validator
+    headers = {
+        "ETag": f'"{image["content_hash"]}-{variant}"',
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=http_status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    size = os.path.getsize(path)
+    byte_range = _parse_range(request.headers["range"], size) if "range" in request.headers else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+    
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file_range(path, start, length),
+        status_code=http_status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
+
+def _gallery_filter(filters: ImageFilter, with_status: bool = True) -> dict:
+    query = {}
+    if filters.device_id:
+        query["device_id"] = filters.device_id
+    if with_status and filters.status:
+        query["status"] = filters.status
+    if filters.start_date or filters.end_date:
+        query["captured_at"] = {}
+        if filters.start_date:
+            query["captured_at"]["$gte"] = filters.start_date
+        if filters.end_date:
+            query["captured_at"]["$lte"] = filters.end_date
+    return query
+
+def _keyset_filter(cursor: str) -> dict:
+    # Keyset: everything strictly after the last (captured_at, _id) seen
+    last_captured_at, last_id = _decode_cursor(cursor)
+    return {"$or": [
+        {"captured_at": {"$lt": last_captured_at}},
+        {"captured_at": last_captured_at, "_id": {"$lt": last_id}},
+    ]}
+
+async def _gallery_page_with_counts(db, filters: ImageFilter, limit: int):
+    """First gallery page plus per-status and per-device counts in one aggregation.
+
+    The shared $match (device and date range) and sort run once on an index;
+    the status filter is applied inside the facets so the status counts
+    cover every tab of the gallery.
+    """
+    status_match = {"status": filters.status} if filters.status else {}
+    pipeline = [
+        {"$match": _gallery_filter(filters, with_status=False)},
+        {"$sort": {"captured_at": -1, "_id": -1}},
+        {"$facet": {
+            "images": [
+                {"$match": status_match},
+                {"$limit": limit},
+                {"$project": IMAGE_GALLERY_PROJECTION},
+            ],
+            "status_counts": [
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ],
+            "device_counts": [
+                {"$match": status_match},
+                {"$group": {"_id": "$device_id", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": IMAGES_FACET_DEVICE_LIMIT},
+            ],
+        }},
+    ]
+    result = await db.images.aggregate(pipeline).to_list(length=1)
+    facets = result[0] if result else {"images": [], "status_counts": [], "device_counts": []}
+    counts = {
+        "status": {entry["_id"]: entry["count"] for entry in facets["status_counts"]},
+        "device": {entry["_id"]: entry["count"] for entry in facets["device_counts"]},
+    }
+    return facets["images"], counts
+
 @router.get("/images")
 async def get_images(
-    status: str = None,
-    device_id: str = None,
+    filters: ImageFilter = Depends(),
+    cursor: str = None,
+    limit: int = Query(IMAGES_DEFAULT_PAGE_SIZE, ge=1, le=IMAGES_MAX_PAGE_SIZE),
+    counts: bool = True,
     current_user: User = Depends(get_current_user)
 ):
-    """Get filtered images from gallery"""
-    db = get_database()
-    filter_query = {}
-    
-    if status:
-        filter_query["status"] = status
-    if device_id:
-        filter_query["device_id"] = device_id
-    
-    images_cursor = db.images.find(filter_query).sort("captured_at", -1)
-    images = await images_cursor.to_list(length=None)
-    
-    # Convert MongoDB documents to the expected format
-    formatted_images = []
-    for img in images:
-        formatted_images.append({
-            "id": img.get("image_id"),
-            "device_id": img.get("device_id"),
-            "filename": img.get("filename"),
-            "status": img.get("status"),
-            "timestamp": img.get("captured_at").strftime("%Y-%m-%d %I:%M %p") if img.get("captured_at") else None,
-            "notes": img.get("notes")
-        })
-    
-    return formatted_images
+    """Get a page of filtered images from the gallery, newest first.
+
+    Pass the returned next_cursor back as cursor to fetch the following page.
+    The first page also carries per-status and per-device counts for the
+    same device and date range unless counts is false.
+    """
+    if filters.start_date and filters.end_date and filters.start_date > filters.end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    db = get_read_database()
+    facet_counts = None
+    if counts and not cursor:
+        images, facet_counts = await _gallery_page_with_counts(db, filters, limit)
+    else:
+        filter_query = _gallery_filter(filters)
+        if cursor:
+            filter_query = {"$and": [filter_query, _keyset_filter(cursor)]} if filter_query else _keyset_filter(cursor)
+        images_cursor = (
+            db.images.find(filter_query, IMAGE_GALLERY_PROJECTION)
+            .sort([("captured_at", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        images = await images_cursor.to_list(length=limit)
+    
+    next_cursor = None
+    if len(images) == limit:
+        last = images[-1]
+        next_cursor = _encode_cursor(last["captured_at"], last["_id"])
+    
+    response = {
+        "images": [_format_gallery_image(img) for img in images],
+        "next_cursor": next_cursor,
+        "limit": limit
+    }
+    if facet_counts is not None:
+        response["counts"] = facet_counts
+    return response
+
+# Fields returned after tagging
+IMAGE_TAG_PROJECTION = {
+    **IMAGE_GALLERY_PROJECTION,
+    "_id": 0,
+    "reviewed_by": 1,
+    "reviewed_at": 1,
+}
 
 @router.put("/images/{image_id}/tag")
 async def tag_image(
@@ -66,18 +341,69 @@ async def tag_image(
         "reviewed_at": datetime.utcnow()
     }
     
-    result = await db.images.update_one(
+    updated_image = await db.images.find_one_and_update(
         {"image_id": image_id},
-        {"$set": update_data}
+        {"$set": update_data},
+        projection=IMAGE_TAG_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_image is None:
         raise HTTPException(status_code=404, detail="Image not found")
     
-    # Get updated image
-    updated_image = await db.images.find_one({"image_id": image_id})
     return {"message": "Image tagged successfully", "image": updated_image}
 
+@router.put("/images/tag")
+async def bulk_tag_images(
+    update: ImageBulkUpdate,
+    current_user: User = Depends(get_current_user)
+):
+    """Apply one status and notes to many images in a single round trip"""
+    db = get_database()
+    image_ids = list(dict.fromkeys(update.image_ids))
+    reviewed_at = datetime.utcnow()
+    update_data = {
+        "status": update.status,
+        "notes": update.notes,
+        "reviewed_by": current_user.username,
+        "reviewed_at": reviewed_at
+    }
+    operations = [UpdateOne({"image_id": image_id}, {"$set": update_data}) for image_id in image_ids]
+    
+    failed = {}
+    try:
+        result = await db.images.bulk_write(operations, ordered=False)
+        matched = result.matched_count
+    except BulkWriteError as e:
+        matched = e.details.get("nMatched", 0)
+        for error in e.details.get("writeErrors", []):
+            failed[image_ids[error["index"]]] = error.get("errmsg", "write failed")
+    
+    # Only look up which ids matched when some did not
+    if matched + len(failed) == len(image_ids):
+        missing = set()
+    else:
+        found = await db.images.find(
+            {"image_id": {"$in": image_ids}}, {"_id": 0, "image_id": 1}
+        ).to_list(length=len(image_ids))
+        missing = set(image_ids) - {doc["image_id"] for doc in found}
+    
+    results = []
+    for image_id in image_ids:
+        if image_id in failed:
+            results.append({"image_id": image_id, "result": "error", "detail": failed[image_id]})
+        elif image_id in missing:
+            results.append({"image_id": image_id, "result": "not_found"})
+        else:
+            results.append({"image_id": image_id, "result": "updated"})
+    
+    return {
+        "updated": sum(1 for r in results if r["result"] == "updated"),
+        "not_found": len(missing),
+        "failed": len(failed),
+        "results": results
+    }
+
 @router.post("/images/{image_id}/notes")
 async def save_image_notes(
     image_id: str,
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from typing import List
 from models.auth import User
-from models.devices import Device, Alert
-from services.device_service import get_all_devices, get_recent_alerts, generate_mock_data
+from models.devices import Device, DeviceUpdate, Alert
+from services.device_service import get_all_devices, get_recent_alerts, generate_mock_data, provision_devices, update_device
+from services.device_import import parse_device_rows, detect_format, DEVICE_IMPORT_FORMATS
+from services.device_registry import device_registry
+from services.rollup_service import get_voltage_trend
+from services.summary_service import device_summary
+from services.serialization import FastJSONResponse, dump_models
 from routes.auth import get_current_user
-import random
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 router = APIRouter()
 
@@ -16,34 +20,26 @@ async def initialize_dashboard():
     return {"message": "Dashboard initialized with mock data"}
 
 @router.get("/overview")
-async def get_dashboard_overview(current_user: User = Depends(get_current_user)):
-    devices = await get_all_devices()
+async def get_dashboard_overview(
+    window_minutes: int = Query(60, ge=5, le=7 * 24 * 60),
+    current_user: User = Depends(get_current_user)
+):
     alerts = await get_recent_alerts(5)
     
-    # Generate mock magnetometer readings
-    voltage_data = []
-    base_time = datetime.utcnow() - timedelta(hours=1)
-    for i in range(60):  # Last hour, minute by minute
-        voltage_data.append({
-            "timestamp": (base_time + timedelta(minutes=i)).isoformat(),
-            "voltage": round(3.25 + random.uniform(-0.1, 0.1), 3)
-        })
+    # Magnetometer readings from the rollup buckets
+    voltage_data = await get_voltage_trend(timedelta(minutes=window_minutes))
     
-    # System status summary
-    device_status_counts = {"safe": 0, "warning": 0, "alert": 0}
-    for device in devices:
-        device_status_counts[device.status] += 1
-    
-    return {
+    return FastJSONResponse({
         "summary": {
-            "total_devices": len(devices),
-            "magnetometer_voltage": round(3.25 + random.uniform(-0.05, 0.05), 3),
+            "total_devices": device_summary.total,
+            "magnetometer_voltage": device_summary.magnetometer_voltage(),
             "perimeter_status": "Safe",
             "system_heartbeat": "Online",
-            "device_status_counts": device_status_counts
+            "device_status_counts": device_summary.status_counts(),
+            "device_type_counts": device_summary.type_counts()
         },
         "voltage_trend": voltage_data,
-        "recent_alerts": alerts,
+        "recent_alerts": dump_models(alerts),
         "system_status": [
             {
                 "device_id": "MAG-001-A",
@@ -52,12 +48,43 @@ async def get_dashboard_overview(current_user: User = Depends(get_current_user))
                 "last_update": "2 minutes ago"
             }
         ]
-    }
+    })
 
 @router.get("/devices", response_model=List[Device])
 async def get_devices(current_user: User = Depends(get_current_user)):
-    return await get_all_devices()
+    # Registry entries are already trusted models; skip response_model re-validation
+    return FastJSONResponse(dump_models(await get_all_devices()))
+
+@router.put("/devices/{device_id}", response_model=Device)
+async def edit_device(device_id: str, update: DeviceUpdate, current_user: User = Depends(get_current_user)):
+    """Update a device's status, voltage, description or position"""
+    if (update.latitude is None) != (update.longitude is None):
+        raise HTTPException(status_code=400, detail="latitude and longitude must be set together")
+    device = await update_device(device_id, update)
+    if device is None:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return device
+
+@router.post("/devices/refresh")
+async def refresh_devices(current_user: User = Depends(get_current_user)):
+    """Force a full reload of the in-memory device registry"""
+    await device_registry.refresh()
+    await device_summary.load()
+    return device_registry.stats()
+
+@router.post("/devices/import")
+async def import_devices(
+    file: UploadFile = File(...),
+    format: str = Query(None, pattern=f"^({'|'.join(DEVICE_IMPORT_FORMATS)})$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Bulk-provision devices from a CSV or NDJSON file of DeviceCreate rows"""
+    try:
+        rows = parse_device_rows(await file.read(), format or detect_format(file.filename))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await provision_devices(rows)
 
 @router.get("/alerts", response_model=List[Alert])
 async def get_alerts(current_user: User = Depends(get_current_user)):
-    return await get_recent_alerts()
\ No newline at end of file
+    return FastJSONResponse(dump_models(await get_recent_alerts()))
\ No newline at end of file
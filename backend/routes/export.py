@@ -0,0 +1,93 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from models.auth import User
+from routes.auth import get_current_user
+from services.export_service import (
+    iter_export_documents, stream_ndjson, stream_csv, chain_documents,
+    IMAGE_EXPORT_FIELDS, ALERT_EXPORT_FIELDS
+)
+from services.retention_service import iter_archived_documents, retention_archiver
+
+router = APIRouter()
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _export_response(documents, fields, format: str, name: str) -> StreamingResponse:
+    body = stream_csv(documents, fields) if format == "csv" else stream_ndjson(documents, fields)
+    filename = f"{name}_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/images")
+async def export_images(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    status: str = None,
+    device_id: str = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    archive: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream image records captured in [start_date, end_date) as NDJSON or CSV.
+
+    With archive=true, records already moved to the cold archive come first.
+    """
+    extra_filter = {}
+    if status:
+        extra_filter["status"] = status
+    if device_id:
+        extra_filter["device_id"] = device_id
+    documents = iter_export_documents(
+        "images", "captured_at", IMAGE_EXPORT_FIELDS, start_date, end_date, extra_filter
+    )
+    if archive:
+        documents = chain_documents(
+            iter_archived_documents("images", start_date, end_date, extra_filter), documents
+        )
+    return _export_response(documents, IMAGE_EXPORT_FIELDS, format, "images")
+
+@router.get("/alerts")
+async def export_alerts(
+    start_date: datetime = None,
+    end_date: datetime = None,
+    severity: str = None,
+    device_id: str = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    archive: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream alerts created in [start_date, end_date) as NDJSON or CSV.
+
+    With archive=true, records already moved to the cold archive come first.
+    """
+    extra_filter = {}
+    if severity:
+        extra_filter["severity"] = severity
+    if device_id:
+        extra_filter["device_id"] = device_id
+    documents = iter_export_documents(
+        "alerts", "created_at", ALERT_EXPORT_FIELDS, start_date, end_date, extra_filter
+    )
+    if archive:
+        documents = chain_documents(
+            iter_archived_documents("alerts", start_date, end_date, extra_filter), documents
+        )
+    return _export_response(documents, ALERT_EXPORT_FIELDS, format, "alerts")
+
+
+@router.get("/retention")
+async def get_retention_stats(current_user: User = Depends(get_current_user)):
+    """Archiver counters and the configured hot windows"""
+    return retention_archiver.stats()
+
+@router.post("/retention/run")
+async def run_retention(current_user: User = Depends(get_current_user)):
+    """Archive everything past its hot window now instead of waiting for the next pass"""
+    return {"archived": await retention_archiver.run_once()}
@@ -1,12 +1,31 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, status as http_status
+from pymongo.errors import DuplicateKeyError, WriteError
 from typing import List, Dict, Any
 from models.auth import User
 from models.devices import Device
-from services.device_service import get_all_devices, get_devices_in_radius
+from models.zones import Zone, ZoneCreate, ZoneUpdate, ZoneEvaluation
+from services.device_service import get_all_devices, get_devices_in_radius, find_map_pin_documents, MAP_PIN_PROJECTION
+from services.map_service import (
+    find_devices_in_bounds, get_viewport_clusters, find_nearest_devices, distance_meters,
+    tile_cache, nearest_cache,
+    MAP_CLUSTER_MAX_ZOOM, MAP_MIN_ZOOM, MAP_MAX_ZOOM, MAP_NEAREST_MAX_K
+)
+from services.zone_service import zone_engine, list_zones, create_zone, update_zone, delete_zone
 from routes.auth import get_current_user
 
 router = APIRouter()
 
+def _pin_from_document(doc: dict) -> Dict[str, Any]:
+    longitude, latitude = doc["location"]["coordinates"]
+    return {
+        "id": doc["device_id"],
+        "position": [latitude, longitude],
+        "status": doc["status"],
+        "type": doc["type"],
+        "name": doc["name"],
+        "description": doc.get("description")
+    }
+
 @router.get("/devices")
 async def get_map_devices(current_user: User = Depends(get_current_user)):
     """Get all devices for map display"""
@@ -38,37 +57,118 @@ async def get_nearby_devices(
     """Get devices within specified radius"""
     devices = await get_devices_in_radius(longitude, latitude, radius)
     
+    # $near already returns them nearest first
     map_pins = []
     for device in devices:
-        longitude, latitude = device.location.coordinates
+        device_longitude, device_latitude = device.location.coordinates
         map_pins.append({
             "id": device.device_id,
-            "position": [latitude, longitude],
+            "position": [device_latitude, device_longitude],
             "status": device.status,
             "type": device.type,
             "name": device.name,
-            "description": device.description
+            "description": device.description,
+            "distance_m": round(distance_meters(longitude, latitude, device_longitude, device_latitude), 1)
         })
     
     return {"pins": map_pins}
 
+@router.get("/devices/nearest")
+async def get_nearest_devices(
+    longitude: float = Query(..., ge=-180, le=180),
+    latitude: float = Query(..., ge=-90, le=90),
+    k: int = Query(5, ge=1, le=MAP_NEAREST_MAX_K),
+    type: List[str] = Query([]),
+    status: List[str] = Query([]),
+    max_distance: float = Query(None, gt=0),  # meters
+    current_user: User = Depends(get_current_user)
+):
+    """The k nearest devices to a point, optionally filtered by type and status"""
+    documents = await find_nearest_devices(
+        longitude, latitude, k, MAP_PIN_PROJECTION,
+        types=type, statuses=status, max_distance=max_distance
+    )
+    pins = []
+    for doc in documents:
+        pin = _pin_from_document(doc)
+        pin["distance_m"] = doc["distance_m"]
+        pin["bearing_deg"] = doc["bearing_deg"]
+        pins.append(pin)
+    return {"pins": pins}
+
+@router.get("/cache/stats")
+async def get_map_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit/miss counters for the cluster tile and nearest-device caches"""
+    return {"tiles": tile_cache.stats(), "nearest": nearest_cache.stats()}
+
+@router.get("/viewport")
+async def get_viewport_devices(
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=MAP_MIN_ZOOM, le=MAP_MAX_ZOOM),
+    current_user: User = Depends(get_current_user)
+):
+    """Get the devices visible in a viewport, clustered below MAP_CLUSTER_MAX_ZOOM"""
+    if south >= north or west >= east:
+        raise HTTPException(status_code=400, detail="Invalid viewport bounds")
+    bounds = (west, south, east, north)
+    
+    if zoom >= MAP_CLUSTER_MAX_ZOOM:
+        documents = await find_devices_in_bounds(bounds, MAP_PIN_PROJECTION)
+        return {"zoom": zoom, "pins": [_pin_from_document(doc) for doc in documents], "clusters": []}
+    
+    try:
+        clusters = await get_viewport_clusters(bounds, zoom)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"zoom": zoom, "pins": [], "clusters": clusters}
+
 @router.get("/overlays") 
 async def get_map_overlays(current_user: User = Depends(get_current_user)):
-    """Get map overlays for zones and alerts"""
-    overlays = [
-        {
-            "type": "tampering",
-            "bounds": [[51.504, -0.11], [51.506, -0.09]], 
-            "label": "Tampering Detection Zone Alpha"
-        },
-        {
-            "type": "illegal",
-            "bounds": [[51.507, -0.08], [51.508, -0.07]],
-            "label": "Illegal Activity Alert - Sector B" 
-        }
-    ]
-    
-    return {"overlays": overlays}
+    """Get map overlays for the live geofence zones"""
+    return {"overlays": zone_engine.overlays()}
+
+@router.get("/zones", response_model=List[Zone])
+async def get_zones(current_user: User = Depends(get_current_user)):
+    return await list_zones()
+
+@router.post("/zones", response_model=Zone, status_code=http_status.HTTP_201_CREATED)
+async def add_zone(zone: ZoneCreate, current_user: User = Depends(get_current_user)):
+    try:
+        return await create_zone(zone)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Zone already exists")
+    except WriteError as e:
+        # 2dsphere rejects self-intersecting or otherwise invalid polygons
+        raise HTTPException(status_code=400, detail=f"Invalid zone geometry: {e}")
+
+@router.put("/zones/{zone_id}", response_model=Zone)
+async def edit_zone(zone_id: str, update: ZoneUpdate, current_user: User = Depends(get_current_user)):
+    try:
+        zone = await update_zone(zone_id, update)
+    except WriteError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zone geometry: {e}")
+    if zone is None:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return zone
+
+@router.delete("/zones/{zone_id}")
+async def remove_zone(zone_id: str, current_user: User = Depends(get_current_user)):
+    if not await delete_zone(zone_id):
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return {"message": "Zone deleted"}
+
+@router.post("/zones/evaluate")
+async def evaluate_zones(event: ZoneEvaluation, current_user: User = Depends(get_current_user)):
+    """Test a detection or device position against the zones, raising breach/entry alerts"""
+    zones = zone_engine.evaluate(event.device_id, event.longitude, event.latitude, kind=event.kind)
+    return {"zones": [{"zone_id": zone.zone_id, "name": zone.name, "type": zone.type} for zone in zones]}
+
+@router.get("/zones/stats")
+async def get_zone_stats(current_user: User = Depends(get_current_user)):
+    return zone_engine.stats()
 
 @router.get("/filters")
 async def get_available_filters(current_user: User = Depends(get_current_user)):
@@ -84,20 +184,10 @@ async def apply_map_filters(
     current_user: User = Depends(get_current_user)
 ):
     """Apply filters and return filtered devices"""
-    devices = await get_all_devices()
-    
-    filtered_pins = []
-    for device in devices:
-        # Check if device matches active filters
-        if filters.get(device.status, False) and filters.get(device.type, False):
-            longitude, latitude = device.location.coordinates
-            filtered_pins.append({
-                "id": device.device_id,
-                "position": [latitude, longitude],
-                "status": device.status,
-                "type": device.type,
-                "name": device.name,
-                "description": device.description
-            })
+    # A device is shown when both its status and its type are enabled
+    enabled = [key for key, active in filters.items() if active]
+    if not enabled:
+        return {"pins": []}
     
-    return {"pins": filtered_pins}
\ No newline at end of file
+    documents = await find_map_pin_documents(statuses=enabled, types=enabled)
+    return {"pins": [_pin_from_document(doc) for doc in documents]}
@@ -0,0 +1,54 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status
+from models.auth import User
+from routes.auth import get_current_user, get_user_from_token
+from services.broadcaster import broadcaster, Subscriber
+
+router = APIRouter()
+
+async def _send_events(websocket: WebSocket, subscriber: Subscriber):
+    while True:
+        message = await subscriber.queue.get()
+        if message is None:
+            return
+        await websocket.send_text(message)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients only listen; anything they send is ignored
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        return
+
+@router.websocket("/ws")
+async def events_socket(websocket: WebSocket, token: str):
+    """Push channel for new alerts and device status changes.
+
+    Browsers cannot set headers on a WebSocket, so the JWT is passed as ?token=.
+    """
+    try:
+        await get_user_from_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    subscriber = broadcaster.subscribe()
+    sender = asyncio.create_task(_send_events(websocket, subscriber))
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        broadcaster.unsubscribe(subscriber)
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+    
+    if subscriber.lagging:
+        # Tell the client to reconnect and resync rather than trust a gappy stream
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+
+@router.get("/stats")
+async def get_realtime_stats(current_user: User = Depends(get_current_user)):
+    return broadcaster.stats()
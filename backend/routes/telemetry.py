@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from models.auth import User
+from models.telemetry import TelemetryBatch
+from routes.auth import get_current_user
+from services.telemetry_service import telemetry_buffer, TelemetryBufferFull
+
+router = APIRouter()
+
+@router.post("/batch", status_code=status.HTTP_202_ACCEPTED)
+async def ingest_telemetry(batch: TelemetryBatch, current_user: User = Depends(get_current_user)):
+    """Accept a batch of device readings for buffered, bulk persistence"""
+    try:
+        accepted = await telemetry_buffer.add(batch.readings)
+    except TelemetryBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Telemetry buffer full, please retry",
+            headers={"Retry-After": "1"},
+        )
+    return {"accepted": accepted, "pending": telemetry_buffer.pending}
+
+@router.get("/stats")
+async def get_telemetry_stats(current_user: User = Depends(get_current_user)):
+    return telemetry_buffer.stats()
@@ -0,0 +1,41 @@
+"""Bulk-provision devices from CSV or NDJSON files.
+
+Each row is a DeviceCreate: device_id, name, type, latitude, longitude and
+an optional description. Run from backend/:
+    python -m scripts.import_devices segment-7.csv more.ndjson
+"""
+import argparse
+import asyncio
+import json
+
+from database import connect_to_mongo, close_mongo_connection
+from services.device_import import parse_device_rows, detect_format, DEVICE_IMPORT_FORMATS
+from services.device_service import provision_devices
+
+
+async def run(args):
+    await connect_to_mongo()
+    try:
+        results = {}
+        for path in args.files:
+            with open(path, "rb") as f:
+                rows = parse_device_rows(f.read(), args.format or detect_format(path))
+            results[path] = await provision_devices(rows)
+        return results
+    finally:
+        await close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--format", choices=DEVICE_IMPORT_FORMATS, help="defaults to the file extension")
+    args = parser.parse_args()
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if any(result["errors"] for result in results.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
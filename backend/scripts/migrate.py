@@ -0,0 +1,40 @@
+"""Apply MongoDB index migrations.
+
+Run from backend/ before rolling out workers started with
+MONGODB_CREATE_INDEXES_ON_STARTUP=false:
+    python -m scripts.migrate [--force]
+"""
+import argparse
+import asyncio
+import sys
+
+from pymongo.errors import PyMongoError
+
+import database
+from config import settings
+
+
+async def run(force: bool):
+    # The migration itself runs here, in the foreground
+    settings.MONGODB_CREATE_INDEXES_ON_STARTUP = False
+    await database.connect_to_mongo()
+    try:
+        await database.ensure_indexes(force=force)
+    finally:
+        await database.close_mongo_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="rebuild even if the recorded version is current")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run(args.force))
+    except PyMongoError as e:
+        # Non-zero exit so a deploy pipeline stops before rolling out workers
+        print(f"Index migration failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
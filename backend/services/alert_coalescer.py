@@ -0,0 +1,168 @@
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from database import get_database
+
+# Repeats of the same (device, type) within this window fold into one alert
+ALERT_COALESCE_WINDOW_SECONDS = float(os.getenv("ALERT_COALESCE_WINDOW_SECONDS", "60"))
+ALERT_FLUSH_INTERVAL_SECONDS = float(os.getenv("ALERT_FLUSH_INTERVAL_SECONDS", "1.0"))
+ALERT_FLUSH_SIZE = int(os.getenv("ALERT_FLUSH_SIZE", "500"))
+# Open alerts remembered for duplicate detection
+ALERT_OPEN_INDEX_SIZE = int(os.getenv("ALERT_OPEN_INDEX_SIZE", "10000"))
+DUPLICATE_KEY_ERROR = 11000
+
+
+class AlertCoalescer:
+    """Folds alert storms into single alerts and writes them in batches.
+
+    Open alerts live in a bounded LRU keyed by (device_id, type), so the
+    duplicate check never touches the database. New alerts and occurrence
+    updates are queued and flushed with one insert_many plus one bulk_write.
+    """
+
+    def __init__(
+        self,
+        window: float = ALERT_COALESCE_WINDOW_SECONDS,
+        flush_interval: float = ALERT_FLUSH_INTERVAL_SECONDS,
+        flush_size: int = ALERT_FLUSH_SIZE,
+        index_size: int = ALERT_OPEN_INDEX_SIZE
+    ):
+        self.window = timedelta(seconds=window)
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.index_size = index_size
+        self.coalesced = 0
+        self._open: "OrderedDict[Tuple[str, str], dict]" = OrderedDict()
+        self._new: Dict[ObjectId, dict] = {}
+        self._dirty: Dict[ObjectId, dict] = {}
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    def record(self, device_id: str, alert_type: str, message: str, severity: str) -> Tuple[dict, bool]:
+        """Register an occurrence; returns the alert document and whether it is new"""
+        now = datetime.utcnow()
+        key = (device_id, alert_type)
+        alert_doc = self._open.get(key)
+        if alert_doc is not None and now - alert_doc["last_seen"] <= self.window:
+            alert_doc["occurrence_count"] += 1
+            alert_doc["last_seen"] = now
+            alert_doc["message"] = message
+            self._open.move_to_end(key)
+            if alert_doc["_id"] not in self._new:
+                self._dirty[alert_doc["_id"]] = alert_doc
+            self.coalesced += 1
+            self._maybe_flush()
+            return alert_doc, False
+
+        alert_doc = {
+            "_id": ObjectId(),
+            "device_id": device_id,
+            "type": alert_type,
+            "message": message,
+            "severity": severity,
+            "acknowledged": False,
+            "occurrence_count": 1,
+            "first_seen": now,
+            "last_seen": now,
+            "created_at": now
+        }
+        self._open[key] = alert_doc
+        self._open.move_to_end(key)
+        while len(self._open) > self.index_size:
+            self._open.popitem(last=False)
+        self._new[alert_doc["_id"]] = alert_doc
+        self._maybe_flush()
+        return alert_doc, True
+
+    @property
+    def pending(self) -> int:
+        return len(self._new) + len(self._dirty)
+
+    def _maybe_flush(self):
+        if self.pending >= self.flush_size and not self._flush_lock.locked():
+            self._size_flush = asyncio.create_task(self._flush_quietly())
+
+    async def flush(self):
+        async with self._flush_lock:
+            new, self._new = self._new, {}
+            dirty, self._dirty = self._dirty, {}
+            # Snapshot: the live documents keep changing while the write is in flight
+            inserts = [dict(doc) for doc in new.values()]
+            updates = [
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {"occurrence_count": doc["occurrence_count"], "message": doc["message"]},
+                        "$max": {"last_seen": doc["last_seen"]},
+                    }
+                )
+                for doc in dirty.values()
+            ]
+            db = get_database()
+            error = None
+            if inserts:
+                try:
+                    await db.alerts.insert_many(inserts, ordered=False)
+                except BulkWriteError as e:
+                    # A duplicate key means an earlier attempt already wrote that alert
+                    for write_error in e.details.get("writeErrors", []):
+                        if write_error.get("code") != DUPLICATE_KEY_ERROR:
+                            object_id = inserts[write_error["index"]]["_id"]
+                            self._new.setdefault(object_id, new[object_id])
+                            error = e
+                except PyMongoError as e:
+                    # Nothing is known to be written; retried inserts of written alerts hit the branch above
+                    for object_id, doc in new.items():
+                        self._new.setdefault(object_id, doc)
+                    error = e
+            if updates:
+                try:
+                    await db.alerts.bulk_write(updates, ordered=False)
+                except PyMongoError as e:
+                    for object_id, doc in dirty.items():
+                        self._dirty.setdefault(object_id, doc)
+                    error = error or e
+            if error is not None:
+                raise error
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except PyMongoError as e:
+            print(f"Alert flush failed: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_quietly()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._open),
+            "pending": self.pending,
+            "coalesced": self.coalesced,
+            "window_seconds": self.window.total_seconds(),
+        }
+
+
+alert_coalescer = AlertCoalescer()
@@ -0,0 +1,160 @@
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, List, Optional
+import numpy as np
+
+# Samples of history per sensor, taken every sample interval
+ANOMALY_WINDOW_SAMPLES = int(os.getenv("ANOMALY_WINDOW_SAMPLES", "60"))
+ANOMALY_SAMPLE_INTERVAL_SECONDS = float(os.getenv("ANOMALY_SAMPLE_INTERVAL_SECONDS", "1.0"))
+ANOMALY_DETECT_EVERY_SAMPLES = int(os.getenv("ANOMALY_DETECT_EVERY_SAMPLES", "5"))
+# Each pass scores detect_every samples per sensor, so at 50k sensors a pass makes
+# 250k tests: z > 6 over at least 30 baseline samples keeps pure noise to roughly
+# one false alarm every few dozen passes (benchmarks.anomaly_detection reports it)
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", "6.0"))
+ANOMALY_MIN_SAMPLES = int(os.getenv("ANOMALY_MIN_SAMPLES", "30"))
+# Floor on the rolling std (volts) so a perfectly flat history cannot flag noise
+ANOMALY_MIN_STD = float(os.getenv("ANOMALY_MIN_STD", "0.01"))
+
+MAGNETOMETER_TYPE = "sensorNode"
+
+
+class VoltageAnomalyDetector:
+    """Rolling z-score detector over a NumPy ring buffer of sensor voltages.
+
+    Each sensor owns a column. Readings only overwrite a `latest` vector;
+    sample() copies it into the ring as one row, and detect() scores every
+    row sampled since the previous pass, for every sensor at once, against
+    the rest of the window.
+    """
+
+    def __init__(self, window: int = ANOMALY_WINDOW_SAMPLES, capacity: int = 1024):
+        self.window = window
+        self._rows: Dict[str, int] = {}
+        self._device_ids: List[str] = []
+        self._latest = np.full(capacity, np.nan)
+        self._ring = np.full((window, capacity), np.nan)
+        self._position = 0
+        self._scored_position = 0  # rows before this were scored by an earlier pass
+
+    @property
+    def sensors(self) -> int:
+        return len(self._device_ids)
+
+    def _row(self, device_id: str) -> int:
+        row = self._rows.get(device_id)
+        if row is None:
+            row = len(self._device_ids)
+            if row == self._latest.shape[0]:
+                self._grow()
+            self._rows[device_id] = row
+            self._device_ids.append(device_id)
+        return row
+
+    def _grow(self):
+        capacity = self._latest.shape[0] * 2
+        latest = np.full(capacity, np.nan)
+        latest[:self._latest.shape[0]] = self._latest
+        ring = np.full((self.window, capacity), np.nan)
+        ring[:, :self._ring.shape[1]] = self._ring
+        self._latest, self._ring = latest, ring
+
+    def record(self, device_id: str, voltage: float):
+        self._latest[self._row(device_id)] = voltage
+
+    def rows_for(self, device_ids: List[str]) -> np.ndarray:
+        return np.fromiter((self._row(d) for d in device_ids), dtype=np.intp, count=len(device_ids))
+
+    def record_rows(self, rows: np.ndarray, voltages: np.ndarray):
+        self._latest[rows] = voltages
+
+    def sample(self):
+        n = self.sensors
+        self._ring[self._position % self.window, :n] = self._latest[:n]
+        self._position += 1
+
+    def detect(self, threshold: float = ANOMALY_Z_THRESHOLD) -> List[dict]:
+        """Score the rows sampled since the last pass against a baseline that excludes them.
+
+        A spike is flagged whichever tick it was sampled on, and a sustained
+        step is scored before it can leak into its own baseline. Each flagged
+        sensor is reported once, with its most extreme new reading.
+        """
+        n = self.sensors
+        # Never score more than half the window; older unscored rows join the baseline
+        pending = min(self._position - self._scored_position, self.window // 2)
+        self._scored_position = self._position
+        if n == 0 or pending == 0:
+            return []
+        new_slots = [(self._position - 1 - i) % self.window for i in range(pending)]
+        baseline = np.ones(self.window, dtype=bool)
+        baseline[new_slots] = False
+        history = self._ring[baseline, :n]
+        valid = ~np.isnan(history)
+        count = valid.sum(axis=0)
+        values = np.where(valid, history, 0.0)
+        safe_count = np.maximum(count, 1)
+        mean = values.sum(axis=0) / safe_count
+        variance = (values * values).sum(axis=0) / safe_count - mean * mean
+        std = np.sqrt(np.maximum(variance, ANOMALY_MIN_STD ** 2))
+        recent = self._ring[new_slots, :n]
+        with np.errstate(invalid="ignore"):
+            z = (recent - mean) / std
+        magnitude = np.where(np.isnan(z), 0.0, np.abs(z))
+        worst = magnitude.argmax(axis=0)
+        columns = np.arange(n)
+        flagged = (count >= ANOMALY_MIN_SAMPLES) & (magnitude[worst, columns] > threshold)
+        return [
+            {
+                "device_id": self._device_ids[row],
+                "voltage": float(recent[worst[row], row]),
+                "mean": float(mean[row]),
+                "z_score": float(z[worst[row], row]),
+            }
+            for row in np.flatnonzero(flagged)
+        ]
+
+
+class AnomalyMonitor:
+    """Samples the detector on a fixed cadence and raises alerts for outliers"""
+
+    def __init__(self, detector: VoltageAnomalyDetector):
+        self.detector = detector
+        self.runs = 0
+        self.anomalies = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, raise_alert: Callable[[str, str, str, str], Awaitable]):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(raise_alert))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, raise_alert):
+        ticks = 0
+        while True:
+            await asyncio.sleep(ANOMALY_SAMPLE_INTERVAL_SECONDS)
+            ticks += 1
+            self.detector.sample()
+            if ticks % ANOMALY_DETECT_EVERY_SAMPLES == 0:
+                for anomaly in self.detector.detect():
+                    self.anomalies += 1
+                    severity = "critical" if abs(anomaly["z_score"]) > 2 * ANOMALY_Z_THRESHOLD else "warning"
+                    await raise_alert(
+                        anomaly["device_id"],
+                        "voltage_anomaly",
+                        f"Voltage {anomaly['voltage']:.3f} V is {anomaly['z_score']:+.1f} standard deviations "
+                        f"from the rolling mean of {anomaly['mean']:.3f} V.",
+                        severity
+                    )
+                self.runs += 1
+
+
+anomaly_detector = VoltageAnomalyDetector()
+anomaly_monitor = AnomalyMonitor(anomaly_detector)
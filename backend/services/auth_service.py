@@ -1,3 +1,6 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -6,20 +9,78 @@ from fastapi import HTTPException, status
 from database import get_database
 from models.auth import User, UserCreate
 from bson import ObjectId
+from services.cache import TTLCache
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Password hashing pool: bcrypt is CPU bound, so it runs on dedicated threads
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Authenticated principal cache, keyed by token subject (username)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_password_executor: Optional[ThreadPoolExecutor] = None
+_password_pending = 0
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _get_password_executor() -> ThreadPoolExecutor:
+    global _password_executor
+    if _password_executor is None:
+        _password_executor = ThreadPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            thread_name_prefix="password-hash"
+        )
+    return _password_executor
+
+async def _run_password_task(func, *args):
+    """Run a bcrypt call on the password pool, rejecting work when the queue is full"""
+    global _password_pending
+    if _password_pending >= PASSWORD_HASH_MAX_QUEUE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication service busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _password_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_password_executor(), func, *args)
+    finally:
+        _password_pending -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_task(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_task(get_password_hash, password)
+
+def get_password_pool_stats() -> dict:
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_queue": PASSWORD_HASH_MAX_QUEUE,
+        "pending": _password_pending,
+    }
+
+def shutdown_password_executor():
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor = None
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -34,13 +95,13 @@ async def authenticate_user(username: str, password: str) -> Optional[User]:
     user_doc = await db.users.find_one({"username": username})
     if not user_doc:
         return None
-    if not verify_password(password, user_doc["hashed_password"]):
+    if not await verify_password_async(password, user_doc["hashed_password"]):
         return None
     return User(**user_doc)
 
 async def create_user(user: UserCreate) -> User:
     db = get_database()
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_doc = {
         "username": user.username,
         "hashed_password": hashed_password,
@@ -49,6 +110,7 @@ async def create_user(user: UserCreate) -> User:
     }
     result = await db.users.insert_one(user_doc)
     user_doc["_id"] = result.inserted_id
+    invalidate_user(user.username)
     return User(**user_doc)
 
 async def get_user_by_username(username: str) -> Optional[User]:
@@ -57,3 +119,16 @@ async def get_user_by_username(username: str) -> Optional[User]:
     if user_doc:
         return User(**user_doc)
     return None
+
+async def get_cached_user(username: str) -> Optional[User]:
+    """Resolve a token subject to a User, serving repeat lookups from memory"""
+    user = principal_cache.get(username)
+    if user is None:
+        user = await get_user_by_username(username)
+        if user is not None:
+            principal_cache.set(username, user)
+    return user
+
+def invalidate_user(username: str):
+    """Drop a cached principal; call whenever the user record changes"""
+    principal_cache.invalidate(username)
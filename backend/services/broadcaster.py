@@ -0,0 +1,84 @@
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Optional, Set
+from bson import ObjectId
+
+# Messages buffered per WebSocket before the oldest ones are dropped
+WS_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("WS_SUBSCRIBER_QUEUE_SIZE", "256"))
+# A subscriber that has dropped this many messages is disconnected
+WS_MAX_DROPPED_MESSAGES = int(os.getenv("WS_MAX_DROPPED_MESSAGES", "1024"))
+
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.lagging = False
+
+
+class Broadcaster:
+    """In-process fan-out of small JSON deltas to WebSocket subscribers.
+
+    publish never waits on a subscriber: a full queue loses its oldest
+    message, and a subscriber that keeps falling behind is cut off so one
+    slow browser cannot hold back the rest.
+    """
+
+    def __init__(self, queue_size: int = WS_SUBSCRIBER_QUEUE_SIZE, max_dropped: int = WS_MAX_DROPPED_MESSAGES):
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self.published = 0
+        self._subscribers: Set[Subscriber] = set()
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event_type: str, data: dict):
+        if not self._subscribers:
+            return
+        # Encode once, share the same string with every subscriber
+        message = json.dumps({"type": event_type, "data": data}, default=_json_default)
+        self.published += 1
+        for subscriber in list(self._subscribers):
+            self._deliver(subscriber, message)
+
+    def _deliver(self, subscriber: Subscriber, message: str):
+        try:
+            subscriber.queue.put_nowait(message)
+            return
+        except asyncio.QueueFull:
+            pass
+        subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(message)
+        subscriber.dropped += 1
+        if subscriber.dropped >= self.max_dropped:
+            subscriber.lagging = True
+            self.unsubscribe(subscriber)
+            # Wake the sender so it can close the socket
+            subscriber.queue.get_nowait()
+            subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "queue_size": self.queue_size,
+        }
+
+
+broadcaster = Broadcaster()
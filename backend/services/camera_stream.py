@@ -0,0 +1,204 @@
+import asyncio
+import io
+import os
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from services.device_registry import device_registry
+
+# Encoded frames kept per camera
+CAMERA_RING_SIZE = int(os.getenv("CAMERA_RING_SIZE", "32"))
+CAMERA_STREAM_FPS = float(os.getenv("CAMERA_STREAM_FPS", "10"))
+# A producer with no viewers for this long disconnects from its camera
+CAMERA_PRODUCER_IDLE_SECONDS = float(os.getenv("CAMERA_PRODUCER_IDLE_SECONDS", "10"))
+CAMERA_DEVICE_TYPE = "camera"
+
+
+class UnknownCameraError(LookupError):
+    """The id is not a registered camera device"""
+
+
+class StreamClosed(Exception):
+    """The producer behind a ring buffer has stopped; no more frames will arrive"""
+
+
+class FrameRingBuffer:
+    """Fixed-size ring of encoded frames shared by every viewer of a camera.
+
+    Frames are immutable bytes, so viewers are handed the same object the
+    producer wrote. Readers always jump to the newest frame; anything they
+    were too slow to see is skipped rather than queued.
+    """
+
+    def __init__(self, capacity: int = CAMERA_RING_SIZE):
+        self.capacity = capacity
+        self.sequence = 0  # sequence number of the next frame to be written
+        self._frames: List[Optional[bytes]] = [None] * capacity
+        self._new_frame = asyncio.Event()
+        self.closed = False
+        self.error: Optional[BaseException] = None
+
+    def publish(self, frame: bytes):
+        self._frames[self.sequence % self.capacity] = frame
+        self.sequence += 1
+        # Wake current waiters and arm a fresh event for the next frame
+        event, self._new_frame = self._new_frame, asyncio.Event()
+        event.set()
+
+    def close(self, error: Optional[BaseException] = None):
+        """Mark the end of the stream and wake every waiter"""
+        self.closed = True
+        self.error = error
+        self._new_frame.set()
+
+    async def wait_newer(self, seen: int) -> Tuple[int, bytes]:
+        """Wait for a frame newer than `seen` and return the newest one.
+
+        Raises StreamClosed once the producer has stopped.
+        """
+        while self.sequence - 1 <= seen:
+            if self.closed:
+                raise StreamClosed(self.error or "stream ended")
+            await self._new_frame.wait()
+        latest = self.sequence - 1
+        return latest, self._frames[latest % self.capacity]
+
+
+class SyntheticFrameSource:
+    """Test pattern camera: a moving bar plus camera id and timestamp, as JPEG"""
+
+    def __init__(self, camera_id: str, width: int = 640, height: int = 360, fps: float = CAMERA_STREAM_FPS):
+        self.camera_id = camera_id
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps
+        self._frame_number = 0
+        self._next_at = time.monotonic()
+
+    def _render(self, frame_number: int) -> bytes:
+        from PIL import Image, ImageDraw
+
+        image = Image.new("RGB", (self.width, self.height), (16, 24, 32))
+        draw = ImageDraw.Draw(image)
+        x = (frame_number * 8) % self.width
+        draw.rectangle([x, 0, x + 24, self.height], fill=(40, 160, 90))
+        draw.text((12, 12), f"{self.camera_id}  #{frame_number}", fill=(255, 255, 255))
+        draw.text((12, 32), datetime.utcnow().isoformat(timespec="milliseconds"), fill=(255, 255, 255))
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=70)
+        return buffer.getvalue()
+
+    async def read(self) -> bytes:
+        self._next_at += self.interval
+        delay = self._next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            self._next_at = time.monotonic()
+        self._frame_number += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._render, self._frame_number)
+
+    async def close(self):
+        pass
+
+
+# Builds the frame source for a camera id; swap for a hardware source in deployment
+frame_source_factory: Callable[[str], SyntheticFrameSource] = SyntheticFrameSource
+
+
+class CameraProducer:
+    """The single connection to one camera, feeding its ring buffer"""
+
+    def __init__(self, camera_id: str):
+        self.camera_id = camera_id
+        self.ring = FrameRingBuffer()
+        self.viewers = 0
+        self._idle_since: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        source = frame_source_factory(self.camera_id)
+        error = None
+        try:
+            while True:
+                if self.viewers == 0:
+                    if self._idle_since is None:
+                        self._idle_since = time.monotonic()
+                    elif time.monotonic() - self._idle_since > CAMERA_PRODUCER_IDLE_SECONDS:
+                        return
+                else:
+                    self._idle_since = None
+                self.ring.publish(await source.read())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Camera {self.camera_id} stream failed: {e}")
+            error = e
+        finally:
+            self.ring.close(error)
+            await source.close()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+class CameraStreamManager:
+    def __init__(self):
+        self._producers: Dict[str, CameraProducer] = {}
+
+    def check_camera(self, camera_id: str):
+        """Raise UnknownCameraError unless the id is a registered camera device"""
+        device = device_registry.get(camera_id)
+        if device is None or device.type != CAMERA_DEVICE_TYPE:
+            raise UnknownCameraError(camera_id)
+
+    def acquire(self, camera_id: str) -> CameraProducer:
+        self.check_camera(camera_id)
+        self._prune()
+        producer = self._producers.get(camera_id)
+        if producer is None or not producer.running:
+            # A stopped producer's ring is closed; viewers still holding it see StreamClosed
+            producer = self._producers[camera_id] = CameraProducer(camera_id)
+            producer.start()
+        producer.viewers += 1
+        return producer
+
+    def release(self, producer: CameraProducer):
+        producer.viewers = max(producer.viewers - 1, 0)
+        self._prune()
+
+    def _prune(self):
+        """Forget producers that have stopped, idle or crashed"""
+        for camera_id, producer in list(self._producers.items()):
+            if not producer.running:
+                del self._producers[camera_id]
+
+    async def stop(self):
+        for producer in self._producers.values():
+            await producer.stop()
+        self._producers.clear()
+
+    def stats(self) -> dict:
+        self._prune()
+        return {
+            camera_id: {"viewers": producer.viewers, "running": producer.running, "frames": producer.ring.sequence}
+            for camera_id, producer in self._producers.items()
+        }
+
+
+camera_streams = CameraStreamManager()
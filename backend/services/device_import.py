@@ -0,0 +1,32 @@
+import csv
+import io
+import json
+from typing import List
+
+DEVICE_IMPORT_FORMATS = ("csv", "ndjson")
+
+
+def detect_format(filename: str) -> str:
+    if filename and filename.lower().endswith(".csv"):
+        return "csv"
+    return "ndjson"
+
+
+def parse_device_rows(content: bytes, format: str) -> List[dict]:
+    """Turn a CSV (with header) or NDJSON upload into raw DeviceCreate rows"""
+    text = content.decode("utf-8-sig")
+    if format == "csv":
+        # Empty cells mean "not provided", not empty strings
+        return [
+            {key: value for key, value in row.items() if value not in ("", None)}
+            for row in csv.DictReader(io.StringIO(text))
+        ]
+    rows = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e.msg}")
+    return rows
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from typing import Callable, Dict, List, Optional
+from pymongo.errors import PyMongoError
+from database import get_database
+from models.devices import Device
+from services.serialization import construct_device
+
+# Full reload if the registry has not been refreshed for this long
+DEVICE_REGISTRY_MAX_STALENESS_SECONDS = float(os.getenv("DEVICE_REGISTRY_MAX_STALENESS_SECONDS", "300"))
+# Follow the devices collection change stream (requires a replica set)
+DEVICE_REGISTRY_CHANGE_STREAM = os.getenv("DEVICE_REGISTRY_CHANGE_STREAM", "false").lower() == "true"
+
+
+class DeviceRegistry:
+    """Process-local copy of the devices collection.
+
+    Loaded once at startup and kept coherent by write-through updates from
+    device_service, optionally by a change stream, and by a full reload once
+    the snapshot is older than the staleness bound.
+    """
+
+    def __init__(self, max_staleness: float = DEVICE_REGISTRY_MAX_STALENESS_SECONDS):
+        self.max_staleness = max_staleness
+        self._devices: Dict[str, Device] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_lock = asyncio.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._refresh_listeners: List[Callable[[List[Device]], None]] = []
+        # Called as handler(previous, current) for change stream writes; upserts into the registry itself
+        self._change_handler: Optional[Callable[[Optional[Device], Device], None]] = None
+
+    @property
+    def is_stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_staleness
+
+    async def refresh(self):
+        """Reload every device from MongoDB, replacing the current snapshot"""
+        async with self._refresh_lock:
+            db = get_database()
+            devices = await db.devices.find().to_list(length=None)
+            self._devices = {doc["device_id"]: construct_device(doc) for doc in devices}
+            self._loaded_at = time.monotonic()
+            snapshot = list(self._devices.values())
+            for listener in self._refresh_listeners:
+                listener(snapshot)
+
+    def add_refresh_listener(self, listener: Callable[[List[Device]], None]):
+        """Call listener with the full snapshot after every reload, so views
+        derived from devices can resync with writes made by other workers"""
+        if listener not in self._refresh_listeners:
+            self._refresh_listeners.append(listener)
+
+    async def get_all(self) -> List[Device]:
+        if self.is_stale:
+            await self.refresh()
+        return list(self._devices.values())
+
+    def get(self, device_id: str) -> Optional[Device]:
+        return self._devices.get(device_id)
+
+    def upsert(self, device: Device):
+        self._devices[device.device_id] = device
+
+    def remove(self, device_id: str):
+        self._devices.pop(device_id, None)
+
+    def set_change_handler(self, handler: Callable[[Optional[Device], Device], None]):
+        """Route change stream writes through handler (device_service.apply_device_change),
+        so views derived from devices also see writes made by other workers"""
+        self._change_handler = handler
+
+    def start_change_stream(self):
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    async def _watch(self):
+        db = get_database()
+        try:
+            async with db.devices.watch(full_document="updateLookup") as stream:
+                async for change in stream:
+                    self._apply_change(change)
+        except PyMongoError as e:
+            # Fall back to write-through plus staleness reloads
+            print(f"Device registry change stream stopped: {e}")
+
+    def _apply_change(self, change: dict):
+        operation = change["operationType"]
+        if operation in ("insert", "update", "replace") and change.get("fullDocument"):
+            current = construct_device(change["fullDocument"])
+            previous = self.get(current.device_id)
+            if previous is not None and previous.last_heartbeat > current.last_heartbeat:
+                return  # a newer local write already landed
+            if self._change_handler is not None:
+                # The registry entry is what every derived view currently reflects
+                self._change_handler(previous, current)
+            else:
+                self.upsert(current)
+        elif operation == "delete":
+            object_id = change["documentKey"]["_id"]
+            for device_id, device in list(self._devices.items()):
+                if device.id == object_id:
+                    self.remove(device_id)
+                    # Derived views have no delete hook; the next read reloads and resyncs them
+                    self._loaded_at = None
+                    break
+
+    def stats(self) -> dict:
+        return {
+            "devices": len(self._devices),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at else None,
+            "max_staleness_seconds": self.max_staleness,
+            "change_stream": self._watch_task is not None and not self._watch_task.done(),
+        }
+
+
+device_registry = DeviceRegistry()
+
+
+async def start_device_registry():
+    await device_registry.refresh()
+    if DEVICE_REGISTRY_CHANGE_STREAM:
+        device_registry.start_change_stream()
+
+
+async def stop_device_registry():
+    await device_registry.stop()
@@ -1,15 +1,77 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
-from database import get_database
+import os
+from pydantic import TypeAdapter, ValidationError
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from database import get_database, get_read_database
 from models.devices import Device, DeviceCreate, DeviceUpdate, Alert, GeoLocation
 from bson import ObjectId
 import random
-from services.auth_service import get_password_hash
+from services.auth_service import get_password_hash_async
+from services.device_registry import device_registry
+from services.map_service import invalidate_device_tiles, invalidate_nearest
+from services.rollup_service import update_rollups
+from services.broadcaster import broadcaster
+from services.summary_service import device_summary
+from services.alert_coalescer import alert_coalescer
+from services.anomaly_service import anomaly_detector, MAGNETOMETER_TYPE
+from services.serialization import construct_device, construct_alert
+from services.zone_service import zone_engine, create_zone
+from models.zones import ZoneCreate
+
+# Devices written per insert_many during bulk provisioning
+DEVICE_IMPORT_CHUNK_SIZE = int(os.getenv("DEVICE_IMPORT_CHUNK_SIZE", "1000"))
+DUPLICATE_KEY_ERROR = 11000
+
+_device_create_rows = TypeAdapter(List[DeviceCreate])
+
+def apply_device_change(previous: Optional[Device], current: Device):
+    """Propagate a device write to the in-memory views derived from devices"""
+    device_registry.upsert(current)
+    device_summary.record_change(previous, current)
+    if current.type == MAGNETOMETER_TYPE and current.voltage is not None:
+        anomaly_detector.record(current.device_id, current.voltage)
+    zone_engine.observe_device(previous, current)
+    moved = previous is not None and previous.location.coordinates != current.location.coordinates
+    if previous is None or moved or previous.status != current.status:
+        invalidate_device_tiles(*current.location.coordinates)
+        invalidate_nearest(*current.location.coordinates)
+        if moved:
+            invalidate_device_tiles(*previous.location.coordinates)
+            invalidate_nearest(*previous.location.coordinates)
+        longitude, latitude = current.location.coordinates
+        broadcaster.publish("device_status", {
+            "device_id": current.device_id,
+            "status": current.status,
+            "previous_status": previous.status if previous else None,
+            "type": current.type,
+            "position": [latitude, longitude],
+        })
+
 async def get_all_devices() -> List[Device]:
-    db = get_database()
-    devices_cursor = db.devices.find()
-    devices = await devices_cursor.to_list(length=None)
-    return [Device(**device) for device in devices]
+    """All devices, served from the in-memory registry"""
+    return await device_registry.get_all()
+
+# Only the fields a map pin needs
+MAP_PIN_PROJECTION = {
+    "_id": 0,
+    "device_id": 1,
+    "name": 1,
+    "type": 1,
+    "status": 1,
+    "location": 1,
+    "description": 1,
+}
+
+async def find_map_pin_documents(statuses: List[str], types: List[str]) -> List[dict]:
+    """Raw pin documents for devices matching any of the statuses and any of the types"""
+    db = get_read_database()
+    cursor = db.devices.find(
+        {"status": {"$in": statuses}, "type": {"$in": types}},
+        MAP_PIN_PROJECTION
+    )
+    return await cursor.to_list(length=None)
 
 async def get_device(device_id: str) -> Optional[Device]:
     db = get_database()
@@ -18,9 +80,8 @@ async def get_device(device_id: str) -> Optional[Device]:
         return Device(**device_doc)
     return None
 
-async def create_device(device: DeviceCreate) -> Device:
-    db = get_database()
-    device_doc = {
+def _new_device_document(device: DeviceCreate) -> dict:
+    return {
         "device_id": device.device_id,
         "name": device.name,
         "type": device.type,
@@ -34,9 +95,68 @@ async def create_device(device: DeviceCreate) -> Device:
         "last_heartbeat": datetime.utcnow(),
         "created_at": datetime.utcnow()
     }
+
+async def create_device(device: DeviceCreate) -> Device:
+    db = get_database()
+    device_doc = _new_device_document(device)
     result = await db.devices.insert_one(device_doc)
     device_doc["_id"] = result.inserted_id
-    return Device(**device_doc)
+    created = Device(**device_doc)
+    apply_device_change(None, created)
+    return created
+
+async def provision_devices(rows: List[dict]) -> dict:
+    """Validate and insert a batch of DeviceCreate rows, reporting failures per row.
+
+    Invalid rows and duplicate device_ids are skipped; the rest of the batch
+    is still written.
+    """
+    errors = []
+    try:
+        valid = list(enumerate(_device_create_rows.validate_python(rows)))
+    except ValidationError as e:
+        invalid = {}
+        for error in e.errors():
+            field = '.'.join(map(str, error["loc"][1:]))
+            invalid.setdefault(error["loc"][0], f"{field}: {error['msg']}" if field else error["msg"])
+        for index, message in sorted(invalid.items()):
+            # A row that is not an object (e.g. an NDJSON array line) has no device_id to report
+            device_id = rows[index].get("device_id") if isinstance(rows[index], dict) else None
+            errors.append({"row": index, "device_id": device_id, "error": "invalid", "detail": message})
+        good = [index for index in range(len(rows)) if index not in invalid]
+        valid = list(zip(good, _device_create_rows.validate_python([rows[index] for index in good])))
+    
+    db = get_database()
+    inserted = 0
+    for start in range(0, len(valid), DEVICE_IMPORT_CHUNK_SIZE):
+        chunk = valid[start:start + DEVICE_IMPORT_CHUNK_SIZE]
+        docs = [_new_device_document(device) for _, device in chunk]
+        failed = set()
+        try:
+            await db.devices.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                row, device = chunk[error["index"]]
+                errors.append({
+                    "row": row,
+                    "device_id": device.device_id,
+                    "error": "duplicate" if error["code"] == DUPLICATE_KEY_ERROR else "write_failed",
+                    "detail": error.get("errmsg"),
+                })
+        for index, doc in enumerate(docs):
+            if index not in failed:
+                apply_device_change(None, Device(**doc))
+                inserted += 1
+    
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "received": len(rows),
+        "inserted": inserted,
+        "invalid": sum(1 for error in errors if error["error"] == "invalid"),
+        "duplicates": sum(1 for error in errors if error["error"] == "duplicate"),
+        "errors": errors,
+    }
 
 async def update_device(device_id: str, update: DeviceUpdate) -> Optional[Device]:
     db = get_database()
@@ -47,35 +167,46 @@ async def update_device(device_id: str, update: DeviceUpdate) -> Optional[Device
         update_data["voltage"] = update.voltage
     if update.description:
         update_data["description"] = update.description
+    if update.latitude is not None and update.longitude is not None:
+        update_data["location"] = {"type": "Point", "coordinates": [update.longitude, update.latitude]}
     
     update_data["last_heartbeat"] = datetime.utcnow()
     
-    await db.devices.update_one({"device_id": device_id}, {"$set": update_data})
-    return await get_device(device_id)
+    # The stored document, not the registry copy, is the previous state: the
+    # registry may not have seen this device yet
+    before = await db.devices.find_one_and_update(
+        {"device_id": device_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    if update.voltage is not None:
+        await update_rollups([{
+            "device_id": device_id,
+            "voltage": update.voltage,
+            "recorded_at": update_data["last_heartbeat"]
+        }])
+    updated = Device(**{**before, **update_data})
+    apply_device_change(construct_device(before), updated)
+    return updated
 
 async def get_recent_alerts(limit: int = 10) -> List[Alert]:
-    db = get_database()
+    db = get_read_database()
     alerts_cursor = db.alerts.find().sort("created_at", -1).limit(limit)
     alerts = await alerts_cursor.to_list(length=limit)
-    return [Alert(**alert) for alert in alerts]
+    return [construct_alert(alert) for alert in alerts]
 
 async def create_alert(device_id: str, alert_type: str, message: str, severity: str) -> Alert:
-    db = get_database()
-    alert_doc = {
-        "device_id": device_id,
-        "type": alert_type,
-        "message": message,
-        "severity": severity,
-        "acknowledged": False,
-        "created_at": datetime.utcnow()
-    }
-    result = await db.alerts.insert_one(alert_doc)
-    alert_doc["_id"] = result.inserted_id
+    """Raise an alert; repeats within the coalescing window bump its occurrence count"""
+    alert_doc, is_new = alert_coalescer.record(device_id, alert_type, message, severity)
+    if is_new:
+        broadcaster.publish("alert", alert_doc)
     return Alert(**alert_doc)
 
 async def get_devices_in_radius(longitude: float, latitude: float, radius_meters: float) -> List[Device]:
     """Get devices within a specified radius using MongoDB geospatial queries"""
-    db = get_database()
+    db = get_read_database()
     devices_cursor = db.devices.find({
         "location": {
             "$near": {
@@ -85,7 +216,7 @@ async def get_devices_in_radius(longitude: float, latitude: float, radius_meters
         }
     })
     devices = await devices_cursor.to_list(length=None)
-    return [Device(**device) for device in devices]
+    return [construct_device(device) for device in devices]
 
 # Mock data generation for demo
 async def generate_mock_data():
@@ -100,7 +231,7 @@ async def generate_mock_data():
     if not existing_user:
         user_doc = {
             "username": "operator",
-            "hashed_password": get_password_hash("password"),
+            "hashed_password": await get_password_hash_async("password"),
             "role": "Operator",
             "created_at": datetime.utcnow()
         }
@@ -115,16 +246,36 @@ async def generate_mock_data():
         {"device_id": "CAM-005-E", "name": "Entrance Camera 5", "type": "camera", "lat": 51.503, "lng": -0.11},
     ]
     
-    for device_data in mock_devices:
-        device = DeviceCreate(
-            device_id=device_data["device_id"],
-            name=device_data["name"],
-            type=device_data["type"],
-            latitude=device_data["lat"],
-            longitude=device_data["lng"],
-            description=f"Monitoring device located at perimeter zone"
-        )
-        await create_device(device)
+    await provision_devices([
+        {
+            "device_id": device_data["device_id"],
+            "name": device_data["name"],
+            "type": device_data["type"],
+            "latitude": device_data["lat"],
+            "longitude": device_data["lng"],
+            "description": "Monitoring device located at perimeter zone"
+        }
+        for device_data in mock_devices
+    ])
+    
+    # Sample zones, created after the devices so they do not count as entries
+    mock_zones = [
+        {"zone_id": "ZONE-ALPHA", "name": "Tampering Detection Zone Alpha", "type": "tampering",
+         "severity": "warning", "south": 51.504, "west": -0.11, "north": 51.506, "east": -0.09},
+        {"zone_id": "ZONE-B", "name": "Illegal Activity Alert - Sector B", "type": "illegal",
+         "severity": "critical", "south": 51.507, "west": -0.08, "north": 51.508, "east": -0.07},
+    ]
+    for zone_data in mock_zones:
+        south, west, north, east = zone_data["south"], zone_data["west"], zone_data["north"], zone_data["east"]
+        await create_zone(ZoneCreate(
+            zone_id=zone_data["zone_id"],
+            name=zone_data["name"],
+            type=zone_data["type"],
+            severity=zone_data["severity"],
+            geometry={"type": "Polygon", "coordinates": [[
+                [west, south], [east, south], [east, north], [west, north], [west, south]
+            ]]}
+        ))
     
     # Create sample images
     mock_images = [
@@ -0,0 +1,93 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from bson import ObjectId
+from database import get_read_database
+
+# Documents fetched per server round trip; also the number of rows per streamed chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+IMAGE_EXPORT_FIELDS = [
+    "image_id", "device_id", "filename", "status", "notes",
+    "captured_at", "reviewed_by", "reviewed_at"
+]
+ALERT_EXPORT_FIELDS = [
+    "device_id", "type", "message", "severity", "acknowledged",
+    "acknowledged_by", "occurrence_count", "first_seen", "last_seen", "created_at"
+]
+
+def _date_range_query(time_field: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> dict:
+    query = {}
+    if start_date or end_date:
+        query[time_field] = {}
+        if start_date:
+            query[time_field]["$gte"] = start_date
+        if end_date:
+            query[time_field]["$lt"] = end_date
+    return query
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+async def iter_export_documents(
+    collection: str,
+    time_field: str,
+    fields: List[str],
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    extra_filter: Optional[dict] = None
+) -> AsyncIterator[dict]:
+    """Yield documents oldest first from a server-side cursor, one batch in memory at a time"""
+    db = get_read_database()
+    query = _date_range_query(time_field, start_date, end_date)
+    if extra_filter:
+        query.update(extra_filter)
+    projection = {field: 1 for field in fields}
+    projection["_id"] = 0
+    cursor = (
+        db[collection].find(query, projection)
+        .sort(time_field, 1)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    async for doc in cursor:
+        yield doc
+
+async def stream_ndjson(documents: AsyncIterator[dict], fields: List[str]) -> AsyncIterator[bytes]:
+    lines = []
+    async for doc in documents:
+        row = {field: _export_value(doc.get(field)) for field in fields}
+        lines.append(json.dumps(row))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+async def stream_csv(documents: AsyncIterator[dict], fields: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    writer.writeheader()
+    rows = 0
+    async for doc in documents:
+        writer.writerow({field: _export_value(doc.get(field)) for field in fields})
+        rows += 1
+        if rows >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def chain_documents(*sources: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """Yield from each document source in turn"""
+    for source in sources:
+        async for doc in source:
+            yield doc
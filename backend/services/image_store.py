@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+# Content-addressed capture store: <root>/<variant>/<h[0:2]>/<h[2:4]>/<hash><ext>
+IMAGE_STORE_ROOT = os.getenv("IMAGE_STORE_ROOT", "image_store")
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", "2"))
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+
+# Gallery sizes generated once at ingest (longest edge in pixels)
+IMAGE_VARIANTS = {"thumb": 320, "preview": 1280}
+ORIGINAL_VARIANT = "original"
+
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+    "image/webp": ".webp",
+}
+
+# Pillow format name -> the content type it must have been uploaded as
+IMAGE_FORMAT_CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "WEBP": "image/webp",
+}
+
+_pipeline_executor: Optional[ProcessPoolExecutor] = None
+
+
+class InvalidImageError(ValueError):
+    """Upload bytes that do not decode as the declared image type"""
+
+    def __init__(self, message: str, unsupported: bool = False):
+        super().__init__(message)
+        self.unsupported = unsupported
+
+
+def variant_path(content_hash: str, variant: str, extension: str = ".jpg") -> str:
+    return os.path.join(
+        IMAGE_STORE_ROOT, variant, content_hash[:2], content_hash[2:4], content_hash + extension
+    )
+
+
+def original_path(content_hash: str, content_type: str) -> str:
+    return variant_path(content_hash, ORIGINAL_VARIANT, CONTENT_TYPE_EXTENSIONS[content_type])
+
+
+def _write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _verify_image(data: bytes, content_type: str):
+    """Check the bytes parse as an image of the declared type before anything is stored"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            image.verify()
+    except Exception as e:
+        raise InvalidImageError("Invalid image data") from e
+    if IMAGE_FORMAT_CONTENT_TYPES.get(image_format) != content_type:
+        raise InvalidImageError(f"Image is {image_format}, not {content_type}", unsupported=True)
+
+
+def _store_original(data: bytes, content_type: str) -> Tuple[str, bool]:
+    """Returns the content hash and whether this call created the original"""
+    content_hash = hashlib.sha256(data).hexdigest()
+    path = original_path(content_hash, content_type)
+    if os.path.exists(path):  # identical captures are stored once
+        return content_hash, False
+    _write_atomic(path, data)
+    return content_hash, True
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def render_variants(source: str, targets: Dict[str, str]):
+    """Runs in the pipeline process pool: write each missing resized JPEG variant"""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        for variant, target in targets.items():
+            if os.path.exists(target):
+                continue
+            edge = IMAGE_VARIANTS[variant]
+            resized = image.copy()
+            resized.thumbnail((edge, edge))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            resized.save(tmp_path, "JPEG", quality=80, optimize=True)
+            os.replace(tmp_path, target)
+
+
+def _get_pipeline_executor() -> ProcessPoolExecutor:
+    global _pipeline_executor
+    if _pipeline_executor is None:
+        _pipeline_executor = ProcessPoolExecutor(max_workers=IMAGE_PIPELINE_WORKERS)
+    return _pipeline_executor
+
+
+async def ingest_image(data: bytes, content_type: str) -> dict:
+    """Store a capture by content hash and generate its gallery variants.
+
+    Raises InvalidImageError, with nothing left on disk, if the bytes are not
+    an image of content_type.
+    """
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, _verify_image, data, content_type)
+    content_hash, created = await loop.run_in_executor(None, _store_original, data, content_type)
+    source = original_path(content_hash, content_type)
+    targets = {variant: variant_path(content_hash, variant) for variant in IMAGE_VARIANTS}
+    try:
+        await loop.run_in_executor(_get_pipeline_executor(), render_variants, source, targets)
+    except Exception as e:
+        if created:
+            await loop.run_in_executor(None, _remove_quietly, source)
+        # verify() does not decode pixel data, so a truncated image can still fail here
+        if isinstance(e, (OSError, SyntaxError, ValueError)):
+            raise InvalidImageError("Invalid image data") from e
+        raise
+    return {
+        "content_hash": content_hash,
+        "content_type": content_type,
+        "size": len(data),
+        "variants": list(IMAGE_VARIANTS),
+    }
+
+
+def resolve_variant(content_hash: str, content_type: str, variant: str) -> Optional[str]:
+    if variant == ORIGINAL_VARIANT:
+        path = original_path(content_hash, content_type)
+    else:
+        path = variant_path(content_hash, variant)
+    return path if os.path.exists(path) else None
+
+
+def shutdown_image_pipeline():
+    global _pipeline_executor
+    if _pipeline_executor is not None:
+        _pipeline_executor.shutdown(wait=False, cancel_futures=True)
+        _pipeline_executor = None
@@ -0,0 +1,288 @@
+import asyncio
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+from database import get_read_database
+from services.cache import TTLCache
+
+# Zoom levels below this get clusters instead of individual pins
+MAP_CLUSTER_MAX_ZOOM = int(os.getenv("MAP_CLUSTER_MAX_ZOOM", "14"))
+MAP_MIN_ZOOM = 2  # 2dsphere polygons must stay smaller than a hemisphere
+MAP_MAX_ZOOM = 22
+# Cluster cells per tile edge
+MAP_CLUSTER_GRID_SIZE = int(os.getenv("MAP_CLUSTER_GRID_SIZE", "8"))
+MAP_MAX_VIEWPORT_TILES = int(os.getenv("MAP_MAX_VIEWPORT_TILES", "64"))
+MAP_TILE_CACHE_SIZE = int(os.getenv("MAP_TILE_CACHE_SIZE", "4096"))
+MAP_TILE_CACHE_TTL_SECONDS = float(os.getenv("MAP_TILE_CACHE_TTL_SECONDS", "300"))
+
+# k-nearest search: hot queries are served from candidates fetched around the
+# centre of a quantized cell and re-ranked against the exact query point
+MAP_NEAREST_MAX_K = int(os.getenv("MAP_NEAREST_MAX_K", "50"))
+MAP_NEAREST_CELL_DEGREES = float(os.getenv("MAP_NEAREST_CELL_DEGREES", "0.005"))
+MAP_NEAREST_OVERSAMPLE = int(os.getenv("MAP_NEAREST_OVERSAMPLE", "4"))
+MAP_NEAREST_CACHE_SIZE = int(os.getenv("MAP_NEAREST_CACHE_SIZE", "512"))
+MAP_NEAREST_CACHE_TTL_SECONDS = float(os.getenv("MAP_NEAREST_CACHE_TTL_SECONDS", "60"))
+
+# Sphere radius MongoDB uses for 2dsphere distances
+EARTH_RADIUS_METERS = 6378100.0
+
+# Horizontal polygon edges are split into steps of at most this many degrees so
+# the geodesic edges used by 2dsphere stay close to the parallels they stand for
+_EDGE_STEP_DEGREES = 1.0
+
+tile_cache = TTLCache(maxsize=MAP_TILE_CACHE_SIZE, ttl=MAP_TILE_CACHE_TTL_SECONDS)
+nearest_cache = TTLCache(maxsize=MAP_NEAREST_CACHE_SIZE, ttl=MAP_NEAREST_CACHE_TTL_SECONDS)
+
+Bounds = Tuple[float, float, float, float]  # west, south, east, north
+
+
+def tile_size_degrees(zoom: int) -> float:
+    return 360.0 / (2 ** zoom)
+
+
+def tile_for_point(longitude: float, latitude: float, zoom: int) -> Tuple[int, int]:
+    size = tile_size_degrees(zoom)
+    # The east and north edges (180, 90) belong to the last tile, not one past it;
+    # tiles are square in degrees, so there are half as many rows as columns
+    x = min(math.floor((longitude + 180) / size), 2 ** zoom - 1)
+    y = min(math.floor((latitude + 90) / size), 2 ** (zoom - 1) - 1)
+    return x, y
+
+
+def tile_bounds(x: int, y: int, zoom: int) -> Bounds:
+    size = tile_size_degrees(zoom)
+    west, south = x * size - 180, y * size - 90
+    return west, south, min(west + size, 180.0), min(south + size, 90.0)
+
+
+def tiles_for_viewport(bounds: Bounds, zoom: int) -> List[Tuple[int, int]]:
+    west, south, east, north = bounds
+    min_x, min_y = tile_for_point(west, south, zoom)
+    max_x, max_y = tile_for_point(east, north, zoom)
+    if (max_x - min_x + 1) * (max_y - min_y + 1) > MAP_MAX_VIEWPORT_TILES:
+        raise ValueError("Viewport too large for zoom level")
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def _bounds_filter(bounds: Bounds, half_open: bool = False) -> dict:
+    """Indexed 2dsphere match for a lon/lat box plus an exact coordinate check.
+
+    half_open excludes the east and north edges (except at 180 and 90), so
+    neighbouring tiles never both count a device on their shared edge.
+    """
+    west, south, east, north = bounds
+    steps = max(1, math.ceil((east - west) / _EDGE_STEP_DEGREES))
+    step = (east - west) / steps
+    bottom = [[west + i * step, south] for i in range(steps + 1)]
+    top = [[east - i * step, north] for i in range(steps + 1)]
+    ring = bottom + top + [[west, south]]
+    return {
+        "location": {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [ring]}}},
+        "location.coordinates.0": {"$gte": west, "$lt" if half_open and east < 180 else "$lte": east},
+        "location.coordinates.1": {"$gte": south, "$lt" if half_open and north < 90 else "$lte": north},
+    }
+
+
+async def find_devices_in_bounds(bounds: Bounds, projection: dict) -> List[dict]:
+    db = get_read_database()
+    return await db.devices.find(_bounds_filter(bounds), projection).to_list(length=None)
+
+
+async def _build_tile_clusters(x: int, y: int, zoom: int) -> List[dict]:
+    db = get_read_database()
+    west, south, east, north = tile_bounds(x, y, zoom)
+    cell = (east - west) / MAP_CLUSTER_GRID_SIZE
+    last_cell = MAP_CLUSTER_GRID_SIZE - 1
+    longitude = {"$arrayElemAt": ["$location.coordinates", 0]}
+    latitude = {"$arrayElemAt": ["$location.coordinates", 1]}
+    pipeline = [
+        {"$match": _bounds_filter((west, south, east, north), half_open=True)},
+        {"$project": {
+            "status": 1,
+            "lng": longitude,
+            "lat": latitude,
+            # A device on the 180 or 90 edge falls in the last cell, not one past it
+            "cx": {"$min": [{"$floor": {"$divide": [{"$subtract": [longitude, west]}, cell]}}, last_cell]},
+            "cy": {"$min": [{"$floor": {"$divide": [{"$subtract": [latitude, south]}, cell]}}, last_cell]},
+        }},
+        {"$group": {
+            "_id": {"cx": "$cx", "cy": "$cy", "status": "$status"},
+            "count": {"$sum": 1},
+            "sum_lng": {"$sum": "$lng"},
+            "sum_lat": {"$sum": "$lat"},
+        }},
+        {"$group": {
+            "_id": {"cx": "$_id.cx", "cy": "$_id.cy"},
+            "count": {"$sum": "$count"},
+            "sum_lng": {"$sum": "$sum_lng"},
+            "sum_lat": {"$sum": "$sum_lat"},
+            "statuses": {"$push": {"status": "$_id.status", "count": "$count"}},
+        }},
+    ]
+    clusters = []
+    async for group in db.devices.aggregate(pipeline):
+        count = group["count"]
+        clusters.append({
+            "id": f"{zoom}/{x}/{y}/{int(group['_id']['cx'])}/{int(group['_id']['cy'])}",
+            "position": [group["sum_lat"] / count, group["sum_lng"] / count],
+            "count": count,
+            "status_counts": {entry["status"]: entry["count"] for entry in group["statuses"]},
+        })
+    return clusters
+
+
+async def get_tile_clusters(x: int, y: int, zoom: int) -> List[dict]:
+    key = (zoom, x, y)
+    clusters = tile_cache.get(key)
+    if clusters is None:
+        clusters = await _build_tile_clusters(x, y, zoom)
+        tile_cache.set(key, clusters)
+    return clusters
+
+
+async def get_viewport_clusters(bounds: Bounds, zoom: int) -> List[dict]:
+    tiles = tiles_for_viewport(bounds, zoom)
+    per_tile = await asyncio.gather(*(get_tile_clusters(x, y, zoom) for x, y in tiles))
+    return [cluster for clusters in per_tile for cluster in clusters]
+
+
+def invalidate_device_tiles(longitude: float, latitude: float):
+    """Drop every cached cluster tile that contains the given position"""
+    for zoom in range(MAP_MIN_ZOOM, MAP_CLUSTER_MAX_ZOOM):
+        x, y = tile_for_point(longitude, latitude, zoom)
+        tile_cache.invalidate((zoom, x, y))
+
+
+def distance_meters(longitude: float, latitude: float, to_longitude: float, to_latitude: float) -> float:
+    """Great-circle distance on the same sphere as $geoNear"""
+    phi1, phi2 = math.radians(latitude), math.radians(to_latitude)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(to_longitude - longitude)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bearing_degrees(longitude: float, latitude: float, to_longitude: float, to_latitude: float) -> float:
+    """Initial bearing from the first point to the second, clockwise from north"""
+    phi1, phi2 = math.radians(latitude), math.radians(to_latitude)
+    d_lambda = math.radians(to_longitude - longitude)
+    y = math.sin(d_lambda) * math.cos(phi2)
+    x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(d_lambda)
+    return (math.degrees(math.atan2(y, x)) + 360.0) % 360.0
+
+
+async def _geo_near(longitude: float, latitude: float, limit: int, query: dict,
+                    projection: dict, max_distance: Optional[float] = None) -> List[dict]:
+    """Up to limit matching devices ordered by distance, with distance from the point"""
+    db = get_read_database()
+    geo_near = {
+        "near": {"type": "Point", "coordinates": [longitude, latitude]},
+        "distanceField": "distance",
+        "spherical": True,
+        "key": "location",
+        "query": query,
+    }
+    if max_distance is not None:
+        geo_near["maxDistance"] = max_distance
+    pipeline = [
+        {"$geoNear": geo_near},
+        {"$limit": limit},
+        {"$project": {**projection, "location": 1, "distance": 1}},
+    ]
+    return await db.devices.aggregate(pipeline).to_list(length=None)
+
+
+def _rank(documents: List[dict], longitude: float, latitude: float, k: int,
+          max_distance: Optional[float]) -> List[dict]:
+    ranked = []
+    for doc in documents:
+        to_longitude, to_latitude = doc["location"]["coordinates"]
+        distance = distance_meters(longitude, latitude, to_longitude, to_latitude)
+        if max_distance is None or distance <= max_distance:
+            ranked.append((distance, doc))
+    ranked.sort(key=lambda pair: pair[0])
+    results = []
+    for distance, doc in ranked[:k]:
+        to_longitude, to_latitude = doc["location"]["coordinates"]
+        result = {key: value for key, value in doc.items() if key != "distance"}
+        result["distance_m"] = round(distance, 1)
+        result["bearing_deg"] = round(bearing_degrees(longitude, latitude, to_longitude, to_latitude), 1)
+        results.append(result)
+    return results
+
+
+async def find_nearest_devices(
+    longitude: float,
+    latitude: float,
+    k: int,
+    projection: dict,
+    types: Sequence[str] = (),
+    statuses: Sequence[str] = (),
+    max_distance: Optional[float] = None,
+) -> List[dict]:
+    """The k devices nearest to a point, nearest first, with distance and bearing.
+
+    Candidates are fetched with $geoNear around the centre of the quantized
+    cell containing the point and cached. They cover every matching device
+    within `coverage` metres of that centre, so the re-ranked answer for the
+    exact point is reused only when its k-th distance plus the offset from
+    the centre stays inside that coverage; otherwise the point is queried
+    directly.
+    """
+    query = {}
+    if types:
+        query["type"] = {"$in": sorted(types)}
+    if statuses:
+        query["status"] = {"$in": sorted(statuses)}
+
+    cell_x = math.floor(longitude / MAP_NEAREST_CELL_DEGREES)
+    cell_y = math.floor(latitude / MAP_NEAREST_CELL_DEGREES)
+    key = (cell_x, cell_y, k, tuple(sorted(types)), tuple(sorted(statuses)), tuple(sorted(projection)))
+    entry = nearest_cache.get(key)
+    if entry is None:
+        center = ((cell_x + 0.5) * MAP_NEAREST_CELL_DEGREES, (cell_y + 0.5) * MAP_NEAREST_CELL_DEGREES)
+        limit = k * MAP_NEAREST_OVERSAMPLE
+        candidates = await _geo_near(center[0], center[1], limit, query, projection)
+        coverage = candidates[-1]["distance"] if len(candidates) == limit else math.inf
+        entry = {
+            "center": center,
+            "coverage": coverage,
+            "candidates": candidates,
+            "bbox": _coverage_bounds(center, coverage),
+        }
+        nearest_cache.set(key, entry)
+
+    results = _rank(entry["candidates"], longitude, latitude, k, max_distance)
+    if len(results) == k:
+        reach = distance_meters(longitude, latitude, *results[-1]["location"]["coordinates"])
+    else:
+        reach = max_distance if max_distance is not None else math.inf
+    offset = distance_meters(longitude, latitude, *entry["center"])
+    if reach + offset <= entry["coverage"]:
+        return results
+
+    documents = await _geo_near(longitude, latitude, k, query, projection, max_distance)
+    return _rank(documents, longitude, latitude, k, max_distance)
+
+
+def _coverage_bounds(center: Tuple[float, float], coverage: float) -> Bounds:
+    """Lon/lat box enclosing the coverage circle, for cheap invalidation checks"""
+    if math.isinf(coverage):
+        return -180.0, -90.0, 180.0, 90.0
+    longitude, latitude = center
+    lat_span = math.degrees(coverage / EARTH_RADIUS_METERS)
+    north, south = latitude + lat_span, latitude - lat_span
+    if north >= 90 or south <= -90:
+        return -180.0, max(south, -90.0), 180.0, min(north, 90.0)
+    lon_span = lat_span / math.cos(math.radians(max(abs(north), abs(south))))
+    return longitude - lon_span, south, longitude + lon_span, north
+
+
+def invalidate_nearest(longitude: float, latitude: float) -> int:
+    """Drop cached nearest candidates whose coverage may include the position"""
+    def covers(key, entry):
+        west, south, east, north = entry["bbox"]
+        return south <= latitude <= north and (west <= longitude <= east
+                                               or west <= longitude + 360 <= east
+                                               or west <= longitude - 360 <= east)
+    return nearest_cache.invalidate_where(covers)
@@ -0,0 +1,210 @@
+import bisect
+import time
+from typing import Dict, Tuple
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels, **extra) -> str:
+    parts = [f'{key}="{_escape(value)}"' for key, value in labels + tuple(extra.items())]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, kind: str = "counter"):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(**labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for labels, value in self.values.items():
+            yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Gauge(Counter):
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text, kind="gauge")
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self.values: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = _labels(**labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(labels, le=bound)} {cumulative}"
+            cumulative += series[len(self.buckets)]
+            yield f"{self.name}_bucket{_format_labels(labels, le='+Inf')} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template"
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+mongo_command_duration = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command"
+)
+mongo_command_failures = Counter("mongodb_command_failures_total", "Failed MongoDB commands")
+mongo_pool_connections = Gauge("mongodb_pool_connections", "Open MongoDB connections per server")
+mongo_pool_checked_out = Gauge("mongodb_pool_checked_out", "MongoDB connections currently checked out")
+mongo_pool_checkout_failures = Counter("mongodb_pool_checkout_failures_total", "Failed connection checkouts")
+
+ALL_METRICS = (
+    http_request_duration, http_requests_in_flight,
+    mongo_command_duration, mongo_command_failures,
+    mongo_pool_connections, mongo_pool_checked_out, mongo_pool_checkout_failures,
+)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in ALL_METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Per-route latency and in-flight tracking, keyed by route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def _route_template(self, scope) -> str:
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(route, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = self._route_template(scope)
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(route=route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec(route=route)
+            http_request_duration.observe(
+                time.perf_counter() - start, method=method, route=route, status=str(status["code"])
+            )
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        # getMore carries the cursor id under its own name and the collection separately
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        else:
+            target = event.command.get(event.command_name)
+        self._collections[event.request_id] = target if isinstance(target, str) else ""
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_command_duration.observe(
+            event.duration_micros / 1e6, command=event.command_name, collection=collection
+        )
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        mongo_command_duration.observe(
+            event.duration_micros / 1e6, command=event.command_name, collection=collection
+        )
+        mongo_command_failures.inc(command=event.command_name, collection=collection)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        mongo_pool_connections.inc(address=self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        mongo_pool_connections.dec(address=self._address(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        mongo_pool_checkout_failures.inc(address=self._address(event), reason=str(event.reason))
+
+    def connection_checked_out(self, event):
+        mongo_pool_checked_out.inc(address=self._address(event))
+
+    def connection_checked_in(self, event):
+        mongo_pool_checked_out.dec(address=self._address(event))
+
+
+mongo_event_listeners = [MongoCommandMetrics(), MongoPoolMetrics()]
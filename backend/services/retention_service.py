@@ -0,0 +1,229 @@
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import zstandard
+from bson import json_util
+from pymongo.errors import DuplicateKeyError
+from config import settings
+from database import get_database, create_ttl_index
+
+# collection -> (time field, hot window)
+RETENTION_POLICIES: Dict[str, Tuple[str, timedelta]] = {
+    "images": ("captured_at", timedelta(days=settings.RETENTION_IMAGES_HOT_DAYS)),
+    "alerts": ("created_at", timedelta(days=settings.RETENTION_ALERTS_HOT_DAYS)),
+}
+
+ARCHIVE_SUFFIX = ".ndjson.zst"
+# Extended JSON keeps ObjectId and datetime types; datetimes stay naive UTC like the driver's
+ARCHIVE_JSON_OPTIONS = json_util.JSONOptions(json_mode=json_util.JSONMode.RELAXED, tz_aware=False)
+
+
+def _day_dir(collection: str, day: datetime) -> Path:
+    return Path(settings.RETENTION_ARCHIVE_DIR) / collection / day.strftime("%Y/%m/%d")
+
+
+def _write_part(collection: str, documents: List[dict], time_field: str) -> List[Path]:
+    """Write documents into one zstd NDJSON part per UTC day; returns the part paths.
+
+    Each part is written to a temporary name and renamed once complete, so a
+    scan never sees a partial file.
+    """
+    by_day: Dict[str, List[dict]] = {}
+    for doc in documents:
+        by_day.setdefault(doc[time_field].strftime("%Y-%m-%d"), []).append(doc)
+
+    compressor = zstandard.ZstdCompressor(level=settings.RETENTION_ZSTD_LEVEL)
+    # Part names sort in write order within a day
+    part_name = f"part-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}{ARCHIVE_SUFFIX}"
+    paths = []
+    for day, day_documents in by_day.items():
+        directory = _day_dir(collection, datetime.strptime(day, "%Y-%m-%d"))
+        directory.mkdir(parents=True, exist_ok=True)
+        payload = "".join(
+            json_util.dumps(doc, json_options=ARCHIVE_JSON_OPTIONS) + "\n"
+            for doc in day_documents
+        ).encode()
+        path = directory / part_name
+        temporary = path.with_name(path.name + ".tmp")
+        with open(temporary, "wb") as f:
+            f.write(compressor.compress(payload))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        paths.append(path)
+    return paths
+
+
+def _read_part(path: Path) -> List[dict]:
+    with open(path, "rb") as f:
+        with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            data = reader.read()
+    return [json_util.loads(line, json_options=ARCHIVE_JSON_OPTIONS) for line in data.decode().splitlines() if line]
+
+
+class RetentionArchiver:
+    """Moves documents past their hot window from MongoDB into the local archive.
+
+    Each batch is written and fsynced before its documents are deleted, so a
+    crash in between can only leave a document in both places, never in
+    neither. Scans may therefore see the occasional duplicate.
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.archived: Dict[str, int] = {collection: 0 for collection in RETENTION_POLICIES}
+        self.parts_written = 0
+        self.last_run_at: Optional[datetime] = None
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if settings.RETENTION_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        # First pass right away: the TTL backstop only exists once a pass has drained the backlog
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                # Archive I/O errors included; the next pass retries
+                print(f"Retention pass failed: {e}")
+            await asyncio.sleep(settings.RETENTION_INTERVAL_SECONDS)
+
+    async def _acquire_lease(self, collection: str) -> bool:
+        db = get_database()
+        now = datetime.utcnow()
+        try:
+            await db.retention_leases.update_one(
+                {"_id": collection, "$or": [{"expires_at": {"$lt": now}}, {"owner": self._owner}]},
+                {"$set": {"owner": self._owner, "expires_at": now + timedelta(seconds=settings.RETENTION_LEASE_SECONDS)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _release_lease(self, collection: str):
+        db = get_database()
+        await db.retention_leases.delete_one({"_id": collection, "owner": self._owner})
+
+    async def archive_collection(self, collection: str, now: Optional[datetime] = None) -> int:
+        """Archive every document of the collection older than its hot window.
+
+        Once nothing past the hot window is left, the TTL backstop is created
+        or brought up to date; until then TTL cannot delete unarchived documents.
+        """
+        time_field, hot_window = RETENTION_POLICIES[collection]
+        cutoff = (now or datetime.utcnow()) - hot_window
+        if not await self._acquire_lease(collection):
+            return 0
+        db = get_database()
+        archived = 0
+        try:
+            while True:
+                documents = await (
+                    db[collection].find({time_field: {"$lt": cutoff}})
+                    .sort(time_field, 1)
+                    .limit(settings.RETENTION_BATCH_SIZE)
+                    .to_list(length=settings.RETENTION_BATCH_SIZE)
+                )
+                if not documents:
+                    await create_ttl_index(db[collection], time_field, hot_window.days)
+                    break
+                paths = await asyncio.to_thread(_write_part, collection, documents, time_field)
+                self.parts_written += len(paths)
+                await db[collection].delete_many({"_id": {"$in": [doc["_id"] for doc in documents]}})
+                archived += len(documents)
+                self.archived[collection] += len(documents)
+                if not await self._acquire_lease(collection):  # extend while work remains
+                    break
+        finally:
+            await self._release_lease(collection)
+        return archived
+
+    async def run_once(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        archived = {}
+        for collection in RETENTION_POLICIES:
+            archived[collection] = await self.archive_collection(collection, now)
+        self.runs += 1
+        self.last_run_at = datetime.utcnow()
+        return archived
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.RETENTION_ENABLED,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "archived": dict(self.archived),
+            "parts_written": self.parts_written,
+            "hot_days": {collection: policy[1].days for collection, policy in RETENTION_POLICIES.items()},
+            "archive_dir": settings.RETENTION_ARCHIVE_DIR,
+        }
+
+
+retention_archiver = RetentionArchiver()
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Archived datetimes are naive UTC; convert aware bounds so they compare"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _archive_parts(collection: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> List[Path]:
+    """Part files whose day directory overlaps [start_date, end_date), oldest day first"""
+    root = Path(settings.RETENTION_ARCHIVE_DIR) / collection
+    if not root.is_dir():
+        return []
+    start_day = start_date.strftime("%Y/%m/%d") if start_date else None
+    end_day = end_date.strftime("%Y/%m/%d") if end_date else None
+    parts = []
+    for day_dir in sorted(root.glob("*/*/*")):
+        day = day_dir.relative_to(root).as_posix()
+        if start_day and day < start_day:
+            continue
+        if end_day and day > end_day:
+            continue
+        parts.extend(sorted(day_dir.glob(f"*{ARCHIVE_SUFFIX}")))
+    return parts
+
+
+async def iter_archived_documents(
+    collection: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    extra_filter: Optional[dict] = None
+) -> AsyncIterator[dict]:
+    """Yield archived documents with time field in [start_date, end_date), oldest day first.
+
+    Only the day directories in range are opened and one part is decoded at a
+    time. extra_filter supports plain equality on top-level fields.
+    """
+    time_field, _ = RETENTION_POLICIES[collection]
+    start_date, end_date = _naive_utc(start_date), _naive_utc(end_date)
+    for path in _archive_parts(collection, start_date, end_date):
+        for doc in await asyncio.to_thread(_read_part, path):
+            timestamp = doc.get(time_field)
+            if start_date and timestamp < start_date:
+                continue
+            if end_date and timestamp >= end_date:
+                continue
+            if extra_filter and any(doc.get(field) != value for field, value in extra_filter.items()):
+                continue
+            yield doc
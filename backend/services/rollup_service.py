@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from pymongo import UpdateOne
+from database import get_database, get_read_database
+from services.device_registry import device_registry
+
+# Bucket widths in seconds: 1 min, 15 min, 1 h
+ROLLUP_RESOLUTIONS = (60, 900, 3600)
+# Finest resolution is used as long as the window fits in this many points
+TREND_MAX_POINTS = 120
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Fleet series share the rollup collection, keyed by a reserved device_id per device type
+FLEET_ROLLUP_PREFIX = "fleet:"
+
+
+def fleet_rollup_id(device_type: str) -> str:
+    return f"{FLEET_ROLLUP_PREFIX}{device_type}"
+
+
+def bucket_start(timestamp: datetime, resolution: int) -> datetime:
+    seconds = int((timestamp - _EPOCH).total_seconds())
+    return _EPOCH + timedelta(seconds=seconds - seconds % resolution)
+
+
+def pick_resolution(window: timedelta) -> int:
+    for resolution in ROLLUP_RESOLUTIONS:
+        if window.total_seconds() / resolution <= TREND_MAX_POINTS:
+            return resolution
+    return ROLLUP_RESOLUTIONS[-1]
+
+
+def rollup_operations(readings: List[dict]) -> List[UpdateOne]:
+    """Upserts folding voltage readings into min/max/sum/count buckets at every resolution.
+
+    Besides the per-device buckets, each reading from a known device also
+    lands in its device type's fleet series, so fleet charts read one
+    document per bucket.
+    """
+    buckets: Dict[Tuple[str, int, datetime], list] = {}
+    types: Dict[str, Optional[str]] = {}
+
+    def fold(key, voltage):
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [voltage, voltage, voltage, 1]
+        else:
+            bucket[0] = min(bucket[0], voltage)
+            bucket[1] = max(bucket[1], voltage)
+            bucket[2] += voltage
+            bucket[3] += 1
+
+    for reading in readings:
+        device_id = reading["device_id"]
+        if device_id not in types:
+            device = device_registry.get(device_id)
+            types[device_id] = device.type if device else None
+        device_type = types[device_id]
+        for resolution in ROLLUP_RESOLUTIONS:
+            start = bucket_start(reading["recorded_at"], resolution)
+            fold((device_id, resolution, start), reading["voltage"])
+            if device_type:
+                fold((fleet_rollup_id(device_type), resolution, start), reading["voltage"])
+
+    operations = []
+    for (device_id, resolution, start), (low, high, total, count) in buckets.items():
+        if device_id.startswith(FLEET_ROLLUP_PREFIX):
+            device_type = device_id[len(FLEET_ROLLUP_PREFIX):]
+        else:
+            device_type = types[device_id]
+        operations.append(UpdateOne(
+            {"device_id": device_id, "resolution": resolution, "bucket": start},
+            {
+                "$min": {"min": low},
+                "$max": {"max": high},
+                "$inc": {"sum": total, "count": count},
+                "$setOnInsert": {"device_type": device_type},
+            },
+            upsert=True
+        ))
+    return operations
+
+
+async def write_rollups(operations: List[UpdateOne]):
+    if operations:
+        db = get_database()
+        await db.voltage_rollups.bulk_write(operations, ordered=False)
+
+
+async def update_rollups(readings: List[dict]):
+    await write_rollups(rollup_operations(readings))
+
+
+async def get_voltage_trend(
+    window: timedelta,
+    device_type: Optional[str] = "sensorNode",
+    device_id: Optional[str] = None
+) -> List[dict]:
+    """Fleet (or single device) voltage trend over the window, one point per bucket.
+
+    Reads one series through the (device_id, resolution, bucket) index, so a
+    window costs at most TREND_MAX_POINTS documents whatever the fleet size.
+    """
+    resolution = pick_resolution(window)
+    start = bucket_start(datetime.utcnow() - window, resolution)
+    series_id = device_id or fleet_rollup_id(device_type)
+
+    db = get_read_database()
+    cursor = db.voltage_rollups.find(
+        {"device_id": series_id, "resolution": resolution, "bucket": {"$gte": start}},
+        {"_id": 0, "bucket": 1, "min": 1, "max": 1, "sum": 1, "count": 1}
+    ).sort("bucket", 1)
+    trend = []
+    async for bucket in cursor:
+        trend.append({
+            "timestamp": bucket["bucket"].isoformat(),
+            "voltage": round(bucket["sum"] / bucket["count"], 3),
+            "min": round(bucket["min"], 3),
+            "max": round(bucket["max"], 3),
+        })
+    return trend
@@ -0,0 +1,53 @@
+from typing import Any, Iterable, List
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+from models.devices import Device, Alert, GeoLocation
+
+# Naive datetimes from Mongo are UTC; keep them unsuffixed like pydantic does
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(value: Any):
+    """orjson fallback for types it does not encode natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, "model_dump"):
+        return value.model_dump(by_alias=True)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Returning one of these from a route skips FastAPI's response_model
+    re-validation and jsonable_encoder pass, so only use it for payloads
+    built from trusted database documents.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def construct_device(doc: dict) -> Device:
+    """Build a Device from a stored document without validating it"""
+    location = doc.get("location")
+    if isinstance(location, dict):
+        doc = {**doc, "location": GeoLocation.model_construct(**location)}
+    return Device.model_construct(**doc)
+
+
+def construct_alert(doc: dict) -> Alert:
+    """Build an Alert from a stored document without validating it"""
+    return Alert.model_construct(**doc)
+
+
+def dump_models(models: Iterable[Any]) -> List[dict]:
+    """Dump read models to plain dicts ready for FastJSONResponse"""
+    return [model.model_dump(by_alias=True) for model in models]
@@ -0,0 +1,95 @@
+from collections import Counter
+from typing import Iterable, Optional
+from database import get_database
+from models.devices import Device
+
+
+MAGNETOMETER_TYPE = "sensorNode"
+
+
+class DeviceSummary:
+    """Fleet totals by status and type, loaded once and kept current on device writes"""
+
+    def __init__(self):
+        self.total = 0
+        self.by_status: Counter = Counter()
+        self.by_type: Counter = Counter()
+        # Running sum of the latest voltage of every magnetometer that reports one
+        self.voltage_sum = 0.0
+        self.voltage_count = 0
+
+    async def load(self):
+        """Recount from MongoDB with a single $group over status and type"""
+        db = get_database()
+        pipeline = [
+            {"$group": {
+                "_id": {"status": "$status", "type": "$type"},
+                "count": {"$sum": 1},
+                "voltage_sum": {"$sum": "$voltage"},
+                "voltage_count": {"$sum": {"$cond": [{"$isNumber": "$voltage"}, 1, 0]}},
+            }}
+        ]
+        total, by_status, by_type = 0, Counter(), Counter()
+        voltage_sum, voltage_count = 0.0, 0
+        async for group in db.devices.aggregate(pipeline):
+            count = group["count"]
+            total += count
+            by_status[group["_id"].get("status")] += count
+            by_type[group["_id"].get("type")] += count
+            if group["_id"].get("type") == MAGNETOMETER_TYPE:
+                voltage_sum += group["voltage_sum"]
+                voltage_count += group["voltage_count"]
+        self.total, self.by_status, self.by_type = total, by_status, by_type
+        self.voltage_sum, self.voltage_count = voltage_sum, voltage_count
+
+    def rebuild(self, devices: Iterable[Device]):
+        """Recount from a full device snapshot, e.g. after a registry reload"""
+        total, by_status, by_type = 0, Counter(), Counter()
+        voltage_sum, voltage_count = 0.0, 0
+        for device in devices:
+            total += 1
+            by_status[device.status] += 1
+            by_type[device.type] += 1
+            if device.type == MAGNETOMETER_TYPE and device.voltage is not None:
+                voltage_sum += device.voltage
+                voltage_count += 1
+        self.total, self.by_status, self.by_type = total, by_status, by_type
+        self.voltage_sum, self.voltage_count = voltage_sum, voltage_count
+
+    def _track_voltage(self, device: Device, sign: int):
+        if device.type == MAGNETOMETER_TYPE and device.voltage is not None:
+            self.voltage_sum += sign * device.voltage
+            self.voltage_count += sign
+
+    def record_change(self, previous: Optional[Device], current: Device):
+        if previous is not None:
+            self._track_voltage(previous, -1)
+        self._track_voltage(current, 1)
+        if previous is None:
+            self.total += 1
+            self.by_status[current.status] += 1
+            self.by_type[current.type] += 1
+            return
+        if previous.status != current.status:
+            self.by_status[previous.status] -= 1
+            self.by_status[current.status] += 1
+        if previous.type != current.type:
+            self.by_type[previous.type] -= 1
+            self.by_type[current.type] += 1
+
+    def magnetometer_voltage(self) -> Optional[float]:
+        if not self.voltage_count:
+            return None
+        return round(self.voltage_sum / self.voltage_count, 3)
+
+    def status_counts(self) -> dict:
+        # Always report the standard statuses, plus any others seen
+        counts = {"safe": 0, "warning": 0, "alert": 0}
+        counts.update({status: count for status, count in self.by_status.items() if count})
+        return counts
+
+    def type_counts(self) -> dict:
+        return {device_type: count for device_type, count in self.by_type.items() if count}
+
+
+device_summary = DeviceSummary()
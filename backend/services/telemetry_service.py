@@ -0,0 +1,211 @@
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+from database import get_database
+from models.telemetry import TelemetryReading
+from services.device_registry import device_registry
+from services.device_service import apply_device_change
+from services.rollup_service import rollup_operations, write_rollups
+
+# Flush when this many readings are buffered, or every interval, whichever comes first
+TELEMETRY_FLUSH_SIZE = int(os.getenv("TELEMETRY_FLUSH_SIZE", "5000"))
+TELEMETRY_FLUSH_INTERVAL_SECONDS = float(os.getenv("TELEMETRY_FLUSH_INTERVAL_SECONDS", "1.0"))
+# Readings accepted but not yet written; beyond this ingestion is refused
+TELEMETRY_MAX_BUFFERED = int(os.getenv("TELEMETRY_MAX_BUFFERED", "200000"))
+
+
+class TelemetryBufferFull(Exception):
+    pass
+
+
+def _failed_items(items: list, error: BulkWriteError) -> list:
+    """The items an unordered bulk write reported as not written"""
+    indexes = sorted({write_error["index"] for write_error in error.details.get("writeErrors", [])})
+    return [items[index] for index in indexes]
+
+
+async def _apply_latest_state(readings: List[dict]):
+    db = get_database()
+    # Fold readings in time order so each device keeps its newest voltage and status
+    latest: Dict[str, dict] = {}
+    for reading in sorted(readings, key=lambda r: r["recorded_at"]):
+        state = latest.setdefault(reading["device_id"], {})
+        state["voltage"] = reading["voltage"]
+        state["last_heartbeat"] = reading["recorded_at"]
+        if reading.get("status"):
+            state["status"] = reading["status"]
+
+    # Registry state before the write: a change stream event for this very write
+    # may be applied while bulk_write is in flight
+    before = {device_id: device_registry.get(device_id) for device_id in latest}
+
+    # Never let a late batch overwrite newer state
+    operations = [
+        UpdateOne(
+            {"device_id": device_id, "last_heartbeat": {"$lte": state["last_heartbeat"]}},
+            {"$set": state}
+        )
+        for device_id, state in latest.items()
+    ]
+    await db.devices.bulk_write(operations, ordered=False)
+
+    for device_id, state in latest.items():
+        previous = before[device_id]
+        if previous is None or previous.last_heartbeat > state["last_heartbeat"]:
+            continue
+        current = device_registry.get(device_id)
+        if current is not previous:
+            # Already applied from the change stream (or another write) during the
+            # await; apply from what the derived views now reflect, not twice
+            if current is None or current.last_heartbeat > state["last_heartbeat"]:
+                continue
+            previous = current
+        apply_device_change(previous, previous.model_copy(update=state))
+
+
+class TelemetryWrite:
+    """One batch on its way to MongoDB, remembering which writes have landed.
+
+    A retry sends only what is left: the telemetry rows and rollup upserts a
+    BulkWriteError reported as failed, then the (idempotent) device update.
+    Errors without per-write detail, such as a dropped connection, retry the
+    whole stage and can still write it twice.
+    """
+
+    def __init__(self, readings: List[dict]):
+        self.readings = readings
+        self.uninserted = readings
+        self.rollups = rollup_operations(readings)
+        self.devices_done = False
+
+    async def run(self):
+        db = get_database()
+        if self.uninserted:
+            try:
+                await db.telemetry.insert_many(self.uninserted, ordered=False)
+            except BulkWriteError as e:
+                self.uninserted = _failed_items(self.uninserted, e)
+                raise
+            self.uninserted = []
+        if self.rollups:
+            try:
+                await write_rollups(self.rollups)
+            except BulkWriteError as e:
+                self.rollups = _failed_items(self.rollups, e)
+                raise
+            self.rollups = []
+        if not self.devices_done:
+            await _apply_latest_state(self.readings)
+            self.devices_done = True
+
+
+async def write_telemetry_batch(readings: List[dict]):
+    """Append readings to the time-series collection and coalesce latest device state"""
+    await TelemetryWrite(readings).run()
+
+
+class TelemetryBuffer:
+    """Collects readings in memory and writes them in large batches"""
+
+    def __init__(
+        self,
+        flush_size: int = TELEMETRY_FLUSH_SIZE,
+        flush_interval: float = TELEMETRY_FLUSH_INTERVAL_SECONDS,
+        max_buffered: int = TELEMETRY_MAX_BUFFERED
+    ):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.accepted = 0
+        self.written = 0
+        self.dropped = 0
+        self._readings: List[dict] = []
+        # Batch whose last write attempt failed; retried before anything newer
+        self._retry: Optional[TelemetryWrite] = None
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._size_flush: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._readings) + (len(self._retry.readings) if self._retry else 0)
+
+    async def add(self, readings: List[TelemetryReading]) -> int:
+        if self.pending + len(readings) > self.max_buffered:
+            raise TelemetryBufferFull()
+        received_at = datetime.utcnow()
+        for reading in readings:
+            doc = {
+                "device_id": reading.device_id,
+                "recorded_at": reading.recorded_at or received_at,
+                "voltage": reading.voltage,
+            }
+            if reading.status:
+                doc["status"] = reading.status
+            self._readings.append(doc)
+        self.accepted += len(readings)
+        if len(self._readings) >= self.flush_size and not self._flush_lock.locked():
+            self._size_flush = asyncio.create_task(self._flush_quietly())
+        return len(readings)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._retry is not None or self._readings:
+                if self._retry is None:
+                    batch = self._readings[:self.flush_size]
+                    del self._readings[:self.flush_size]
+                    self._retry = TelemetryWrite(batch)
+                write = self._retry
+                try:
+                    await write.run()
+                except PyMongoError:
+                    # Keep what is left of the batch for the next attempt
+                    raise
+                except Exception:
+                    # Not transient: drop the batch so newer readings still flow
+                    self._retry = None
+                    self.dropped += len(write.readings)
+                    raise
+                self._retry = None
+                self.written += len(write.readings)
+
+    async def _flush_quietly(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Telemetry flush failed: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self._flush_quietly()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "accepted": self.accepted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flush_size": self.flush_size,
+            "flush_interval_seconds": self.flush_interval,
+        }
+
+
+telemetry_buffer = TelemetryBuffer()
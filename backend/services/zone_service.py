@@ -0,0 +1,283 @@
+import asyncio
+import math
+import os
+from collections import deque
+from datetime import datetime
+from typing import Awaitable, Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from database import get_database
+from models.devices import Device
+from models.zones import Zone, ZoneCreate, ZoneUpdate
+
+# Grid cell edge in degrees (~1.1 km of latitude)
+ZONE_GRID_CELL_DEGREES = float(os.getenv("ZONE_GRID_CELL_DEGREES", "0.01"))
+# Zones whose bounding box spans more cells than this skip the grid and are always candidates
+ZONE_GRID_MAX_CELLS = int(os.getenv("ZONE_GRID_MAX_CELLS", "4096"))
+# Reload zones from MongoDB so edits made by other workers are picked up
+ZONE_REFRESH_SECONDS = float(os.getenv("ZONE_REFRESH_SECONDS", "60"))
+# Alerts waiting to be raised; the oldest are dropped beyond this
+ZONE_ALERT_QUEUE_SIZE = int(os.getenv("ZONE_ALERT_QUEUE_SIZE", "10000"))
+
+Ring = List[Tuple[float, float]]
+
+
+def _point_in_ring(longitude: float, latitude: float, ring: Ring) -> bool:
+    """Even-odd ray cast; the ring is closed (first == last)"""
+    inside = False
+    x1, y1 = ring[0]
+    for x2, y2 in ring[1:]:
+        if (y1 > latitude) != (y2 > latitude):
+            crossing = x1 + (latitude - y1) * (x2 - x1) / (y2 - y1)
+            if longitude < crossing:
+                inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+class IndexedZone:
+    """A zone polygon prepared for point tests"""
+
+    __slots__ = ("zone", "shell", "holes", "bbox")
+
+    def __init__(self, zone: Zone):
+        self.zone = zone
+        rings = [[(float(x), float(y)) for x, y in ring] for ring in zone.geometry.coordinates]
+        self.shell = rings[0]
+        self.holes = rings[1:]
+        xs = [x for x, _ in self.shell]
+        ys = [y for _, y in self.shell]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+
+    def contains(self, longitude: float, latitude: float) -> bool:
+        west, south, east, north = self.bbox
+        if not (west <= longitude <= east and south <= latitude <= north):
+            return False
+        if not _point_in_ring(longitude, latitude, self.shell):
+            return False
+        return not any(_point_in_ring(longitude, latitude, hole) for hole in self.holes)
+
+
+class ZoneIndex:
+    """Uniform grid over zone bounding boxes.
+
+    Each cell lists the zones whose bounding box overlaps it, so a point is
+    only ray-cast against the few zones in its own cell.
+    """
+
+    def __init__(self, cell_degrees: float = ZONE_GRID_CELL_DEGREES):
+        self.cell_degrees = cell_degrees
+        self._zones: Dict[str, IndexedZone] = {}
+        self._cells: Dict[Tuple[int, int], List[str]] = {}
+        self._large: List[str] = []
+
+    def __len__(self):
+        return len(self._zones)
+
+    def _cell(self, longitude: float, latitude: float) -> Tuple[int, int]:
+        return math.floor(longitude / self.cell_degrees), math.floor(latitude / self.cell_degrees)
+
+    def rebuild(self, zones: Iterable[Zone]):
+        self._zones = {zone.zone_id: IndexedZone(zone) for zone in zones if zone.active}
+        self._cells = {}
+        self._large = []
+        for zone_id, indexed in self._zones.items():
+            west, south, east, north = indexed.bbox
+            min_x, min_y = self._cell(west, south)
+            max_x, max_y = self._cell(east, north)
+            if (max_x - min_x + 1) * (max_y - min_y + 1) > ZONE_GRID_MAX_CELLS:
+                self._large.append(zone_id)
+                continue
+            for x in range(min_x, max_x + 1):
+                for y in range(min_y, max_y + 1):
+                    self._cells.setdefault((x, y), []).append(zone_id)
+
+    def zones(self) -> List[Zone]:
+        return [indexed.zone for indexed in self._zones.values()]
+
+    def containing(self, longitude: float, latitude: float) -> List[Zone]:
+        """Active zones that contain the point"""
+        candidates = self._cells.get(self._cell(longitude, latitude), [])
+        hits = []
+        for zone_id in (*candidates, *self._large):
+            indexed = self._zones[zone_id]
+            if indexed.contains(longitude, latitude):
+                hits.append(indexed.zone)
+        return hits
+
+
+class ZoneEngine:
+    """Evaluates device positions and detections against the live zones.
+
+    Device positions are tracked per device so a zone_entry alert fires only
+    when a device moves into a zone; a detection inside a zone is always a
+    zone_breach (repeats are folded by the alert coalescer). Alerts are
+    queued synchronously and raised by a background task.
+    """
+
+    def __init__(self):
+        self.index = ZoneIndex()
+        self.evaluations = 0
+        self.alerts_raised = 0
+        self._memberships: Dict[str, FrozenSet[str]] = {}
+        self._pending: Deque[Tuple[str, str, str, str]] = deque(maxlen=ZONE_ALERT_QUEUE_SIZE)
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def load(self, devices: Iterable[Device] = ()):
+        """Load zones and seed device memberships without alerting"""
+        await self.reload()
+        self.seed(devices)
+
+    def seed(self, devices: Iterable[Device]):
+        """Replace memberships from a full device snapshot without alerting.
+
+        Also a registry refresh listener, so moves written by other workers
+        do not surface later as spurious zone_entry alerts.
+        """
+        memberships = {}
+        for device in devices:
+            longitude, latitude = device.location.coordinates
+            memberships[device.device_id] = frozenset(
+                zone.zone_id for zone in self.index.containing(longitude, latitude)
+            )
+        self._memberships = memberships
+
+    def evaluate(self, device_id: str, longitude: float, latitude: float, kind: str = "detection") -> List[Zone]:
+        """Zones containing the point; queues alerts for breaches and new entries"""
+        self.evaluations += 1
+        hits = self.index.containing(longitude, latitude)
+        if kind == "position":
+            previous = self._memberships.get(device_id, frozenset())
+            self._memberships[device_id] = frozenset(zone.zone_id for zone in hits)
+            for zone in hits:
+                if zone.zone_id not in previous:
+                    self._queue(device_id, "zone_entry", f"{device_id} entered zone {zone.name}.", zone.severity)
+        else:
+            for zone in hits:
+                self._queue(device_id, "zone_breach", f"Detection by {device_id} inside zone {zone.name}.", zone.severity)
+        return hits
+
+    def observe_device(self, previous: Optional[Device], current: Device):
+        """Position hook for device writes; only runs when the device is new or moved"""
+        if previous is not None and previous.location.coordinates == current.location.coordinates:
+            return
+        longitude, latitude = current.location.coordinates
+        self.evaluate(current.device_id, longitude, latitude, kind="position")
+
+    def _queue(self, device_id: str, alert_type: str, message: str, severity: str):
+        self._pending.append((device_id, alert_type, message, severity))
+        self._wakeup.set()
+
+    def start(self, raise_alert: Callable[[str, str, str, str], Awaitable]):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(raise_alert))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, raise_alert):
+        loop = asyncio.get_running_loop()
+        next_refresh = loop.time() + ZONE_REFRESH_SECONDS
+        while True:
+            # asyncio.wait rather than wait_for, which can swallow a cancel that races the wakeup
+            waiter = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait({waiter}, timeout=max(0.0, next_refresh - loop.time()))
+            finally:
+                waiter.cancel()
+            self._wakeup.clear()
+            while self._pending:
+                alert = self._pending.popleft()
+                try:
+                    await raise_alert(*alert)
+                    self.alerts_raised += 1
+                except Exception as e:
+                    print(f"Zone alert for {alert[0]} failed: {e}")
+            if loop.time() >= next_refresh:
+                try:
+                    await self.reload()
+                except Exception as e:
+                    print(f"Zone refresh failed: {e}")
+                next_refresh = loop.time() + ZONE_REFRESH_SECONDS
+
+    async def reload(self):
+        """Rebuild the index from MongoDB; memberships are kept, so devices already
+        inside a new zone are not reported until they next move"""
+        db = get_database()
+        documents = await db.zones.find({"active": True}).to_list(length=None)
+        self.index.rebuild(Zone(**doc) for doc in documents)
+
+    def overlays(self) -> List[dict]:
+        """Live zones in the map overlay format: bounds plus the full [lat, lng] outline"""
+        overlays = []
+        for zone in self.index.zones():
+            shell = zone.geometry.coordinates[0]
+            latitudes = [latitude for _, latitude in shell]
+            longitudes = [longitude for longitude, _ in shell]
+            overlays.append({
+                "id": zone.zone_id,
+                "type": zone.type,
+                "bounds": [[min(latitudes), min(longitudes)], [max(latitudes), max(longitudes)]],
+                "polygon": [[latitude, longitude] for longitude, latitude in shell],
+                "label": zone.name,
+                "severity": zone.severity
+            })
+        return overlays
+
+    def stats(self) -> dict:
+        return {
+            "zones": len(self.index),
+            "tracked_devices": len(self._memberships),
+            "evaluations": self.evaluations,
+            "alerts_raised": self.alerts_raised,
+            "pending_alerts": len(self._pending)
+        }
+
+
+zone_engine = ZoneEngine()
+
+
+async def list_zones() -> List[Zone]:
+    db = get_database()
+    documents = await db.zones.find().sort("zone_id", 1).to_list(length=None)
+    return [Zone(**doc) for doc in documents]
+
+
+async def create_zone(zone: ZoneCreate) -> Zone:
+    """Insert a zone; raises DuplicateKeyError if the zone_id is taken"""
+    db = get_database()
+    zone_doc = {**zone.model_dump(), "created_at": datetime.utcnow(), "updated_at": None}
+    result = await db.zones.insert_one(zone_doc)
+    zone_doc["_id"] = result.inserted_id
+    await zone_engine.reload()
+    return Zone(**zone_doc)
+
+
+async def update_zone(zone_id: str, update: ZoneUpdate) -> Optional[Zone]:
+    db = get_database()
+    update_data = update.model_dump(exclude_none=True)
+    update_data["updated_at"] = datetime.utcnow()
+    zone_doc = await db.zones.find_one_and_update(
+        {"zone_id": zone_id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    if zone_doc is None:
+        return None
+    await zone_engine.reload()
+    return Zone(**zone_doc)
+
+
+async def delete_zone(zone_id: str) -> bool:
+    db = get_database()
+    result = await db.zones.delete_one({"zone_id": zone_id})
+    if result.deleted_count:
+        await zone_engine.reload()
+    return bool(result.deleted_count)